@@ -1,8 +1,1661 @@
 import tkinter as tk
 from tkinter import filedialog, scrolledtext, ttk, messagebox
 import os
-import pyperclip
-from pathlib import Path
+import io
+import ast
+import hashlib
+import gzip
+import codecs
+import re
+import json
+import time
+import bisect
+import itertools
+import functools
+from collections import Counter
+
+# Slow imports that are not needed to show the window (concurrent.futures,
+# asyncio, subprocess, zipfile, tarfile, xml.sax.saxutils and pyperclip) are
+# done inside the functions that use them, to keep them off the startup path
+
+
+class OutputFormatter:
+    """Base class for output formats.
+
+    Formatters never build the whole bundle themselves. Each method yields
+    (text, tag) chunks that the caller streams straight into the preview and
+    the clipboard buffer, so the format choice adds no memory of its own.
+    The tag is one of the preview text tags ("file_path", "delimiter") or None.
+    """
+
+    name = None
+
+    def __init__(self, prefix_delimiter="```", suffix_delimiter="```", show_paths=True):
+        self.prefix_delimiter = prefix_delimiter
+        self.suffix_delimiter = suffix_delimiter
+        self.show_paths = show_paths
+
+    def begin(self):
+        """Yield chunks written before the first file."""
+        return iter(())
+
+    def format_tree(self, tree):
+        """Yield the chunks for the directory tree header."""
+        yield tree + "\n\n", None
+
+    def format_file(self, file_path, content):
+        """Yield the chunks for a single file."""
+        raise NotImplementedError
+
+    def end(self):
+        """Yield chunks written after the last file."""
+        return iter(())
+
+
+# Registry of available output formats, keyed by the name shown in the UI
+OUTPUT_FORMATTERS = {}
+
+
+def register_formatter(formatter_class):
+    """Register an OutputFormatter subclass under its name."""
+    OUTPUT_FORMATTERS[formatter_class.name] = formatter_class
+    return formatter_class
+
+
+@register_formatter
+class DelimitedFormatter(OutputFormatter):
+    """Path, prefix delimiter, content, suffix delimiter (the classic layout)."""
+
+    name = "Delimited"
+
+    def format_tree(self, tree):
+        yield "Directory tree", "file_path"
+        yield "\n\n", None
+        yield f"{self.prefix_delimiter}\n", "delimiter"
+        yield tree + "\n", None
+        yield f"{self.suffix_delimiter}\n\n", "delimiter"
+
+    def format_file(self, file_path, content):
+        if self.show_paths:
+            yield file_path, "file_path"
+            yield "\n\n", None
+        yield f"{self.prefix_delimiter}\n", "delimiter"
+        yield content + "\n", None
+        yield f"{self.suffix_delimiter}\n\n", "delimiter"
+
+
+@register_formatter
+class JsonlFormatter(OutputFormatter):
+    """One JSON object per line with path and content keys."""
+
+    name = "JSONL"
+
+    def format_tree(self, tree):
+        yield json.dumps({"tree": tree}, ensure_ascii=False) + "\n", None
+
+    def format_file(self, file_path, content):
+        record = {"path": file_path, "content": content}
+        if not self.show_paths:
+            del record["path"]
+        yield json.dumps(record, ensure_ascii=False) + "\n", None
+
+
+@register_formatter
+class XmlTagFormatter(OutputFormatter):
+    """Each file wrapped in a <file path="..."> tag inside a <files> root.
+
+    Content goes in a CDATA section, so files containing "</file>" or other
+    markup (e.g. XML or this app's own source) cannot end the element early.
+    """
+
+    name = "XML tags"
+
+    def begin(self):
+        yield "<files>\n", "delimiter"
+
+    def cdata(self, text):
+        # "]]>" would close the section, so split it across two sections
+        yield "<![CDATA[", "delimiter"
+        yield text.replace("]]>", "]]]]><![CDATA[>") + "\n", None
+        yield "]]>\n", "delimiter"
+
+    def format_tree(self, tree):
+        yield "<directory_tree>\n", "delimiter"
+        yield from self.cdata(tree)
+        yield "</directory_tree>\n", "delimiter"
+
+    def format_file(self, file_path, content):
+        from xml.sax.saxutils import quoteattr
+
+        if self.show_paths:
+            yield "<file path=", "delimiter"
+            yield quoteattr(file_path), "file_path"
+            yield ">\n", "delimiter"
+        else:
+            yield "<file>\n", "delimiter"
+        yield from self.cdata(content)
+        yield "</file>\n", "delimiter"
+
+    def end(self):
+        yield "</files>\n", "delimiter"
+
+
+@register_formatter
+class MarkdownFormatter(OutputFormatter):
+    """Path heading followed by a fenced code block.
+
+    The fence is one backtick longer than the longest backtick run in the
+    content, so files that contain fences themselves (e.g. README.md) never
+    terminate the block early.
+    """
+
+    name = "Markdown"
+
+    # Fence info strings for common extensions
+    languages = {
+        ".py": "python",
+        ".js": "javascript",
+        ".jsx": "jsx",
+        ".ts": "typescript",
+        ".tsx": "tsx",
+        ".java": "java",
+        ".c": "c",
+        ".h": "c",
+        ".cpp": "cpp",
+        ".hpp": "cpp",
+        ".cs": "csharp",
+        ".go": "go",
+        ".rs": "rust",
+        ".rb": "ruby",
+        ".php": "php",
+        ".sh": "bash",
+        ".html": "html",
+        ".css": "css",
+        ".json": "json",
+        ".yaml": "yaml",
+        ".yml": "yaml",
+        ".toml": "toml",
+        ".md": "markdown",
+        ".sql": "sql",
+    }
+
+    backtick_run = re.compile(r"`{3,}")
+
+    def fence_for(self, content):
+        longest = max((len(m) for m in self.backtick_run.findall(content)), default=2)
+        return "`" * (longest + 1)
+
+    def format_tree(self, tree):
+        yield "### ", None
+        yield "Directory tree", "file_path"
+        yield "\n\n", None
+        fence = self.fence_for(tree)
+        yield f"{fence}\n", "delimiter"
+        yield tree + "\n", None
+        yield f"{fence}\n\n", "delimiter"
+
+    def format_file(self, file_path, content):
+        if self.show_paths:
+            yield "### ", None
+            yield file_path, "file_path"
+            yield "\n\n", None
+        fence = self.fence_for(content)
+        language = self.languages.get(os.path.splitext(file_path)[1].lower(), "")
+        yield f"{fence}{language}\n", "delimiter"
+        yield content + "\n", None
+        yield f"{fence}\n\n", "delimiter"
+
+
+# File names that are never copied
+IGNORED_FILE_NAMES = frozenset([".DS_Store", ".env", ".env.local"])
+
+# Directory names that are never descended into
+IGNORED_DIR_NAMES = frozenset(
+    [".git", ".hcl", ".zip", ".svn", ".hg", "__pycache__", "node_modules"]
+)
+
+# Separates multiple roots in the path field
+ROOT_SEPARATOR = ";"
+
+
+def parse_roots(text):
+    """Split the path field into a list of root paths."""
+    return [root.strip() for root in text.split(ROOT_SEPARATOR) if root.strip()]
+
+
+def parse_ignore_extensions(text):
+    """Turn the comma-separated ignore field into a set of lowercase extensions."""
+    extensions = set()
+    for ext in text.split(","):
+        ext = ext.strip().lower()
+        if ext:
+            # Ensure the extension starts with a dot
+            extensions.add(ext if ext.startswith(".") else "." + ext)
+    return frozenset(extensions)
+
+
+def is_ignored_file(file_path, ignore_extensions):
+    """Check if a file should be ignored based on its name or extension."""
+    file_name = os.path.basename(file_path)
+    if file_name in IGNORED_FILE_NAMES:
+        return True
+    return os.path.splitext(file_name)[1].lower() in ignore_extensions
+
+
+# Kinds of scan entries
+FILE = "File"
+DIRECTORY = "Directory"
+
+
+class FileRecord:
+    """One file or directory found by a scan."""
+
+    __slots__ = (
+        "path",
+        "parent",  # id into FileIndex.parent_paths
+        "kind",  # FILE or DIRECTORY
+        "size",  # bytes on disk, -1 when not from the filesystem
+        "mtime_ns",  # -1 when not from the filesystem
+        "selected",
+        "content",  # decoded text, None until read or when filtered out
+        "opener",  # callable returning a binary file, None to open path
+        "item",  # file tree item id, None when not in the tree
+        "slot",  # insertion number in the file tree, to restore its order
+    )
+
+    def __init__(self, path, parent, kind):
+        self.path = path
+        self.parent = parent
+        self.kind = kind
+        self.size = -1
+        self.mtime_ns = -1
+        self.selected = True
+        self.content = None
+        self.opener = None
+        self.item = None
+        self.slot = -1
+
+
+class FileIndex:
+    """Ordered store of the FileRecords of one scan, addressable by path.
+
+    Parent directories are interned: a record's parent is an int id into
+    parent_paths, so each directory path is held once however many
+    children it has.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.by_path = {}
+        self.parent_paths = []
+        self.parent_ids = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def get(self, path):
+        return self.by_path.get(path)
+
+    def add(self, path, kind, parent_path):
+        """Append a record, or return None if path is already indexed."""
+        if path in self.by_path:
+            return None
+        parent = self.parent_ids.get(parent_path)
+        if parent is None:
+            parent = len(self.parent_paths)
+            self.parent_paths.append(parent_path)
+            self.parent_ids[parent_path] = parent
+        record = FileRecord(path, parent, kind)
+        self.records.append(record)
+        self.by_path[path] = record
+        return record
+
+    def parent_of(self, record):
+        """Return the parent directory path of a record."""
+        return self.parent_paths[record.parent]
+
+    def files(self):
+        return [record for record in self.records if record.kind == FILE]
+
+    def loaded_files(self):
+        """Return the file records that were read and passed the filters."""
+        return [
+            record
+            for record in self.records
+            if record.kind == FILE and record.content is not None
+        ]
+
+
+def walk_root(root_path, recursive, ignore_extensions):
+    """Walk a single root and return its entries in walk order.
+
+    Each entry is a (path, kind, parent path) tuple. A root that is a file
+    yields just that file. Only plain data is touched here, so roots can be
+    walked on worker threads.
+    """
+    entries = []
+
+    if not os.path.isdir(root_path):
+        if not is_ignored_file(root_path, ignore_extensions):
+            entries.append((root_path, FILE, os.path.dirname(root_path)))
+        return entries
+
+    if recursive:
+        for root, dirs, files in os.walk(root_path):
+            # Skip common directories to ignore
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIR_NAMES]
+
+            for dir_name in dirs:
+                entries.append((os.path.join(root, dir_name), DIRECTORY, root))
+
+            for file in files:
+                file_path = os.path.join(root, file)
+                if not is_ignored_file(file_path, ignore_extensions):
+                    entries.append((file_path, FILE, root))
+    else:
+        for item in os.listdir(root_path):
+            if item in IGNORED_DIR_NAMES:
+                continue
+
+            item_path = os.path.join(root_path, item)
+            if os.path.isdir(item_path):
+                entries.append((item_path, DIRECTORY, root_path))
+            elif os.path.isfile(item_path) and not is_ignored_file(
+                item_path, ignore_extensions
+            ):
+                entries.append((item_path, FILE, root_path))
+
+    return entries
+
+
+def scan_roots(roots, recursive, ignore_extensions, max_workers=8, walk=walk_root):
+    """Walk several roots concurrently and merge them into one FileIndex.
+
+    Each root gets its own walker thread, calling
+    walk(root, recursive, ignore_extensions). Results are merged in root order,
+    and paths reached through more than one root (e.g. a directory and one
+    of its subdirectories) are kept only once, at their first occurrence.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    index = FileIndex()
+    seen = set()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(roots)))) as pool:
+        results = pool.map(lambda root: walk(root, recursive, ignore_extensions), roots)
+        for entries in results:
+            for path, kind, parent in entries:
+                if kind == FILE:
+                    key = os.path.normcase(os.path.abspath(path))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                index.add(path, kind, parent)
+
+    return index
+
+
+# Blocking filesystem calls allowed in flight at once by the async engine
+ASYNC_IO_CONCURRENCY = 32
+
+
+def run_async_io(make_coroutine, max_concurrency=ASYNC_IO_CONCURRENCY, executor=None):
+    """Run make_coroutine(run) on a new event loop and return its result.
+
+    run(call) is a coroutine that offloads the blocking call() to a pool of
+    max_concurrency worker threads, so at most that many stats, listings or
+    reads are waiting on the filesystem at any time. Passing an executor
+    uses its workers instead, so loops running side by side (e.g. one per
+    root) share a single limit.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    async def main(executor):
+        loop = asyncio.get_running_loop()
+
+        async def run(call):
+            return await loop.run_in_executor(executor, call)
+
+        return await make_coroutine(run)
+
+    if executor is not None:
+        return asyncio.run(main(executor))
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return asyncio.run(main(executor))
+
+
+def map_async_io(function, items, max_concurrency=ASYNC_IO_CONCURRENCY):
+    """Apply a blocking function to every item concurrently, keeping item order."""
+    import asyncio
+
+    async def gather(run):
+        return await asyncio.gather(
+            *(run(functools.partial(function, item)) for item in items)
+        )
+
+    return run_async_io(gather, max_concurrency)
+
+
+def list_directory(dir_path):
+    """Return (name, kind, is_symlink) for the entries of a directory.
+
+    kind is DIRECTORY, FILE or None for anything else (e.g. a socket).
+    """
+    with os.scandir(dir_path) as entries:
+        listing = []
+        for entry in entries:
+            if entry.is_dir():
+                kind = DIRECTORY
+            elif entry.is_file():
+                kind = FILE
+            else:
+                kind = None
+            listing.append((entry.name, kind, entry.is_symlink()))
+        return listing
+
+
+async def walk_root_async(root_path, recursive, ignore_extensions, run):
+    """Coroutine version of walk_root that lists directories concurrently.
+
+    Every directory listing is awaited through run, and the subdirectories
+    of a directory are walked at the same time, so a deep tree costs one
+    round trip per level instead of one per directory. The entries and
+    their order are the same as walk_root's.
+    """
+    import asyncio
+
+    if not await run(functools.partial(os.path.isdir, root_path)):
+        return walk_root(root_path, recursive, ignore_extensions)
+
+    async def walk(dir_path):
+        listing = await run(functools.partial(list_directory, dir_path))
+
+        entries = []
+        if not recursive:
+            # Listing order, like os.listdir in walk_root
+            for name, kind, _ in listing:
+                item_path = os.path.join(dir_path, name)
+                if name in IGNORED_DIR_NAMES:
+                    continue
+                if kind == DIRECTORY:
+                    entries.append((item_path, DIRECTORY, dir_path))
+                elif kind == FILE and not is_ignored_file(item_path, ignore_extensions):
+                    entries.append((item_path, FILE, dir_path))
+            return entries
+
+        # Subdirectories, then files, then each subdirectory's contents, like
+        # os.walk, which also does not descend into symlinked directories
+        dirs = [
+            (os.path.join(dir_path, name), is_symlink)
+            for name, kind, is_symlink in listing
+            if kind == DIRECTORY and name not in IGNORED_DIR_NAMES
+        ]
+        entries.extend((path, DIRECTORY, dir_path) for path, _ in dirs)
+        for name, kind, _ in listing:
+            file_path = os.path.join(dir_path, name)
+            if kind != DIRECTORY and not is_ignored_file(file_path, ignore_extensions):
+                entries.append((file_path, FILE, dir_path))
+
+        subtrees = await asyncio.gather(
+            *(walk(path) for path, is_symlink in dirs if not is_symlink)
+        )
+        for subtree in subtrees:
+            entries.extend(subtree)
+        return entries
+
+    return await walk(root_path)
+
+
+def async_walk_root(
+    root_path,
+    recursive,
+    ignore_extensions,
+    max_concurrency=ASYNC_IO_CONCURRENCY,
+    executor=None,
+):
+    """Walk-compatible replacement for walk_root for high-latency filesystems."""
+    return run_async_io(
+        functools.partial(walk_root_async, root_path, recursive, ignore_extensions),
+        max_concurrency,
+        executor,
+    )
+
+
+def stat_record(record):
+    """Store the size and mtime of an on-disk file record.
+
+    Returns the error message if the file cannot be stat'ed, else None.
+    Records served by an opener are left alone.
+    """
+    if record.opener is None:
+        try:
+            stat = os.stat(record.path)
+        except Exception as e:
+            return str(e)
+        record.size = stat.st_size
+        record.mtime_ns = stat.st_mtime_ns
+    return None
+
+
+# Where file lists (and, for revisions, file contents) come from
+FILESYSTEM_SOURCE = "Filesystem"
+GIT_TRACKED_SOURCE = "Git tracked files"
+GIT_CHANGED_SOURCE = "Git changed files"
+GIT_REVISION_SOURCE = "Git revision"
+FILE_SOURCES = [
+    FILESYSTEM_SOURCE,
+    GIT_TRACKED_SOURCE,
+    GIT_CHANGED_SOURCE,
+    GIT_REVISION_SOURCE,
+]
+
+
+def run_git(cwd, args, input=None):
+    """Run a git command in cwd and return its raw stdout.
+
+    Raises ValueError if git is missing or the command fails.
+    """
+    import subprocess
+
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=cwd, input=input, capture_output=True, check=True
+        )
+    except FileNotFoundError:
+        raise ValueError("git is not installed or not on PATH")
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode("utf-8", errors="replace").strip()
+        raise ValueError(f"git {args[0]} failed in {cwd}: {message}")
+    return result.stdout
+
+
+def split_nul(output):
+    """Split NUL-terminated git output into native relative paths."""
+    return [
+        os.path.normpath(path.decode("utf-8", errors="surrogateescape"))
+        for path in output.split(b"\0")
+        if path
+    ]
+
+
+def git_list_files(cwd, source, ref, pathspec=()):
+    """List files for a git source as paths relative to cwd.
+
+    Only the part of the repository below cwd is listed, so a root can be
+    any directory inside a checkout.
+    """
+    pathspec = ["--", *pathspec]
+    if source == GIT_TRACKED_SOURCE:
+        return split_nul(run_git(cwd, ["ls-files", "-z", *pathspec]))
+    if source == GIT_CHANGED_SOURCE:
+        # Modified, added and renamed files, plus new files not yet tracked
+        changed = split_nul(
+            run_git(
+                cwd,
+                ["diff", "--name-only", "-z", "--relative", "--diff-filter=d", ref]
+                + pathspec,
+            )
+        )
+        untracked = split_nul(
+            run_git(
+                cwd, ["ls-files", "-z", "--others", "--exclude-standard"] + pathspec
+            )
+        )
+        changed_set = set(changed)
+        return changed + [path for path in untracked if path not in changed_set]
+    if source == GIT_REVISION_SOURCE:
+        return split_nul(
+            run_git(cwd, ["ls-tree", "-r", "-z", "--name-only", ref] + pathspec)
+        )
+    raise ValueError(f"Unknown file source {source!r}")
+
+
+def git_read_blobs(cwd, ref, rel_paths):
+    """Read the content of rel_paths at ref from the object store.
+
+    All blobs come from a single `git cat-file --batch` process. Returns a
+    dict of relative path to bytes.
+    """
+    if not rel_paths:
+        return {}
+    requests = "".join(
+        f"{ref}:./{path.replace(os.sep, '/')}\n" for path in rel_paths
+    ).encode("utf-8", errors="surrogateescape")
+    output = run_git(cwd, ["cat-file", "--batch"], input=requests)
+
+    blobs = {}
+    position = 0
+    for path in rel_paths:
+        header_end = output.index(b"\n", position)
+        header = output[position:header_end].split()
+        position = header_end + 1
+        if header[-1] == b"missing":
+            continue
+        size = int(header[2])
+        blobs[path] = output[position : position + size]
+        position += size + 1  # Content is followed by a newline
+    return blobs
+
+
+def git_walk_root(root_path, recursive, ignore_extensions, source, ref, blobs):
+    """Walk-compatible replacement for walk_root backed by git.
+
+    Files come from the index, a diff or a tree instead of the filesystem.
+    For GIT_REVISION_SOURCE the content of every listed file is read into
+    blobs (full path to bytes) so nothing is read from the working tree.
+    """
+    if os.path.isdir(root_path):
+        cwd, pathspec = root_path, ()
+    else:
+        cwd = os.path.dirname(root_path) or "."
+        pathspec = (os.path.basename(root_path),)
+
+    entries = []
+    directories = set()
+    rel_files = []
+    for rel_path in git_list_files(cwd, source, ref, pathspec):
+        parts = rel_path.split(os.sep)
+        if not recursive and len(parts) > 1:
+            continue
+        if any(part in IGNORED_DIR_NAMES for part in parts[:-1]):
+            continue
+        file_path = os.path.join(cwd, rel_path)
+        if is_ignored_file(file_path, ignore_extensions):
+            continue
+
+        # Create entries for every directory between the root and the file
+        parent = cwd
+        for part in parts[:-1]:
+            dir_path = os.path.join(parent, part)
+            if dir_path not in directories:
+                directories.add(dir_path)
+                entries.append((dir_path, DIRECTORY, parent))
+            parent = dir_path
+        entries.append((file_path, FILE, parent))
+        rel_files.append(rel_path)
+
+    if source == GIT_REVISION_SOURCE:
+        for rel_path, data in git_read_blobs(cwd, ref, rel_files).items():
+            blobs[os.path.join(cwd, rel_path)] = data
+        entries = [
+            entry for entry in entries if entry[1] == DIRECTORY or entry[0] in blobs
+        ]
+
+    return entries
+
+
+def git_change_times(cwd):
+    """Return the time of the last commit touching each file below cwd.
+
+    A single `git log --name-only` over the history. Keys are paths relative
+    to cwd and values are Unix timestamps.
+    """
+    output = run_git(
+        cwd,
+        ["log", "--format=%x00%ct", "--name-only", "-z", "--relative", "--", "."],
+    )
+
+    # Each commit is a NUL, its time, a NUL, then a newline before its
+    # NUL-terminated file names
+    times = {}
+    commit_time = None
+    expect_time = False
+    first_name = False
+    for token in output.split(b"\0"):
+        if not token:
+            expect_time = True
+        elif expect_time:
+            commit_time = int(token)
+            expect_time = False
+            first_name = True
+        else:
+            if first_name and token.startswith(b"\n"):
+                token = token[1:]
+            first_name = False
+            path = os.path.normpath(token.decode("utf-8", errors="surrogateescape"))
+            times[path] = max(times.get(path, commit_time), commit_time)
+    return times
+
+
+# Archives that can be used as roots, read in place without extracting
+ZIP_EXTENSIONS = (".zip",)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+def is_archive(path):
+    """Check if a path is a zip or tar archive that can be scanned as a root."""
+    name = path.lower()
+    return name.endswith(ZIP_EXTENSIONS + TAR_EXTENSIONS) and os.path.isfile(path)
+
+
+def split_member_name(name):
+    """Split an archive member name into path parts, dropping '.' and '..'."""
+    return [
+        part
+        for part in name.replace("\\", "/").split("/")
+        if part not in ("", ".", "..")
+    ]
+
+
+def iter_archive_members(archive_path, archives):
+    """Yield (parts, is_dir, make_opener) for each member of an archive.
+
+    Members come in archive order from a single pass. make_opener() returns
+    a callable that opens the member for binary reading. Zip members are
+    opened lazily from a ZipFile shared by the openers, which is appended to
+    archives for the caller to close once the members are read; tar members
+    are read when make_opener is called, since compressed tars can only be
+    streamed front to back, so it must be called before the next member is
+    yielded.
+    """
+    import tarfile
+    import zipfile
+
+    if archive_path.lower().endswith(ZIP_EXTENSIONS):
+        archive = zipfile.ZipFile(archive_path)
+        archives.append(archive)
+        for info in archive.infolist():
+
+            def make_opener(info=info):
+                return functools.partial(archive.open, info)
+
+            yield split_member_name(info.filename), info.is_dir(), make_opener
+        return
+
+    with tarfile.open(archive_path, "r|*") as archive:
+        for member in archive:
+            if not (member.isdir() or member.isfile()):
+                continue
+
+            def make_opener(member=member):
+                with archive.extractfile(member) as file:
+                    return functools.partial(io.BytesIO, file.read())
+
+            yield split_member_name(member.name), member.isdir(), make_opener
+
+
+def archive_walk_root(
+    root_path, recursive, ignore_extensions, openers, archives, walk=walk_root
+):
+    """Walk-compatible wrapper that also accepts zip and tar archives as roots.
+
+    Roots that are not archives are passed on to walk. An archive is listed
+    like a directory with the same ignore rules and in walk_root order (each
+    directory's subdirectories, then its files, then the subdirectories'
+    contents), with member paths below the archive path. Nothing is
+    extracted: an opener for every listed file is stored in openers (full
+    path to callable), and archives that stay open for the openers are
+    appended to archives.
+    """
+    if not is_archive(root_path):
+        return walk(root_path, recursive, ignore_extensions)
+
+    import tarfile
+    import zipfile
+
+    # Directory path -> ([subdirectory paths], [file paths]) in archive order
+    children = {root_path: ([], [])}
+    archive_openers = {}
+
+    def directory(parts):
+        """Return the path of the directory at parts, adding any missing ones."""
+        parent = root_path
+        for part in parts:
+            dir_path = os.path.join(parent, part)
+            if dir_path not in children:
+                children[dir_path] = ([], [])
+                children[parent][0].append(dir_path)
+            parent = dir_path
+        return parent
+
+    try:
+        for parts, is_dir, make_opener in iter_archive_members(root_path, archives):
+            dir_parts = parts if is_dir else parts[:-1]
+            if not parts or any(part in IGNORED_DIR_NAMES for part in dir_parts):
+                continue
+            if is_dir or (not recursive and dir_parts):
+                directory(dir_parts if recursive else dir_parts[:1])
+                continue
+
+            parent = directory(dir_parts)
+            file_path = os.path.join(parent, parts[-1])
+            if is_ignored_file(file_path, ignore_extensions):
+                continue
+            # A later copy of a member replaces the earlier one, as tar does
+            if file_path not in archive_openers:
+                children[parent][1].append(file_path)
+            archive_openers[file_path] = make_opener()
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+        raise ValueError(f"Cannot read archive {root_path}: {e}")
+
+    entries = []
+    stack = [root_path]
+    while stack:
+        dir_path = stack.pop()
+        dirs, files = children[dir_path]
+        entries.extend((path, DIRECTORY, dir_path) for path in dirs)
+        entries.extend((path, FILE, dir_path) for path in files)
+        stack.extend(reversed(dirs))
+
+    openers.update(archive_openers)
+    return entries
+
+
+# Orders for the emitted files; pinned files always come first
+PATH_ORDER = "Path"
+SIZE_ORDER = "Size (smallest first)"
+MTIME_ORDER = "Modified (newest first)"
+GIT_ORDER = "Git change (newest first)"
+SCAN_ORDER = "Scan order"
+
+
+def order_by_path(record, change_times):
+    # Compare component by component, so a directory's files stay together
+    return record.path.split(os.sep)
+
+
+def order_by_size(record, change_times):
+    # Records not read from disk have no size; use their text length
+    size = record.size if record.size >= 0 else len(record.content or "")
+    return size, order_by_path(record, change_times)
+
+
+def order_by_mtime(record, change_times):
+    # Records not from the filesystem (mtime -1) sort last
+    return -record.mtime_ns, order_by_path(record, change_times)
+
+
+def order_by_git_change(record, change_times):
+    # Files without history (e.g. untracked) fall back to their mtime
+    changed = change_times.get(record.path)
+    if changed is None:
+        changed = max(record.mtime_ns, 0) // 1_000_000_000
+    return -changed, order_by_path(record, change_times)
+
+
+ORDER_STRATEGIES = {
+    PATH_ORDER: order_by_path,
+    SIZE_ORDER: order_by_size,
+    MTIME_ORDER: order_by_mtime,
+    GIT_ORDER: order_by_git_change,
+    SCAN_ORDER: None,
+}
+
+
+def sort_records(records, strategy, pinned=(), change_times=None):
+    """Return file records in emit order.
+
+    Pinned paths come first, in the order they were pinned. The rest are
+    sorted by the strategy's key, or kept in scan order for SCAN_ORDER.
+    Keys only read scan index fields (path, size, mtime) and change_times,
+    a dict of path to commit time for GIT_ORDER, so no content is compared.
+    """
+    order_key = ORDER_STRATEGIES[strategy]
+    pin_rank = {path: rank for rank, path in enumerate(pinned)}
+    unpinned = len(pin_rank)
+    change_times = change_times or {}
+
+    if order_key is None:
+        return sorted(records, key=lambda record: pin_rank.get(record.path, unpinned))
+    return sorted(
+        records,
+        key=lambda record: (
+            pin_rank.get(record.path, unpinned),
+            order_key(record, change_times),
+        ),
+    )
+
+
+def strip_trailing_whitespace(file_path, content):
+    """Remove trailing spaces and tabs from every line."""
+    return "\n".join(line.rstrip() for line in content.split("\n"))
+
+
+def collapse_blank_lines(file_path, content):
+    """Replace runs of blank lines with a single blank line."""
+    return re.sub(r"\n[ \t]*(?:\n[ \t]*)+\n", "\n\n", content)
+
+
+def outline_python(content):
+    """Outline Python source: imports, one-line assignments and def/class headers.
+
+    Function bodies are replaced with "...", classes keep the headers of
+    their methods and nested classes. Raises SyntaxError for invalid code.
+    """
+    tree = ast.parse(content)
+    lines = content.splitlines()
+    outline = []
+
+    def first_line(node):
+        # Decorators come before the def/class line itself
+        decorators = getattr(node, "decorator_list", [])
+        return min([d.lineno for d in decorators] + [node.lineno])
+
+    def inline_body(node):
+        # The body starts on the line that closes the signature, as in
+        # "def f(): return 1" (col_offset counts UTF-8 bytes)
+        body = node.body[0]
+        return bool(lines[body.lineno - 1].encode()[: body.col_offset].strip())
+
+    def header(node):
+        # From the decorators up to the end of the signature
+        if inline_body(node):
+            return lines[first_line(node) - 1 : node.body[0].lineno]
+        return lines[first_line(node) - 1 : first_line(node.body[0]) - 1]
+
+    def add(node):
+        indent = " " * (node.col_offset + 4)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            outline.extend(header(node))
+            if not inline_body(node):
+                outline.append(indent + "...")
+        elif isinstance(node, ast.ClassDef):
+            outline.extend(header(node))
+            members = [
+                child
+                for child in node.body
+                if isinstance(
+                    child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+                )
+            ]
+            for member in members:
+                add(member)
+            if not members and not inline_body(node):
+                outline.append(indent + "...")
+
+    after_definition = False
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign)):
+            # Multi-line assignments are usually large literals, skip them
+            if isinstance(node, (ast.Assign, ast.AnnAssign)):
+                if node.lineno != node.end_lineno:
+                    continue
+            if after_definition:
+                outline.append("")
+                after_definition = False
+            outline.extend(lines[node.lineno - 1 : node.end_lineno])
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if outline:
+                outline.append("")
+            add(node)
+            after_definition = True
+    return "\n".join(outline)
+
+
+# Lightweight definition matchers for languages without a parser here
+OUTLINE_PATTERNS = {
+    (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs"): re.compile(
+        r"^(export\s+)?(default\s+)?(declare\s+)?(abstract\s+)?(async\s+)?"
+        r"(function\*?|class|interface|type|enum|const|let|var)\b"
+        r"|^\s+(public\s+|private\s+|protected\s+|static\s+|async\s+|get\s+|set\s+)*"
+        r"(?!if\b|for\b|while\b|switch\b|return\b|catch\b)[A-Za-z_$][\w$]*\s*\(.*\)"
+        r"(\s*:\s*[^=]+)?\s*\{\s*$"
+    ),
+    (".go",): re.compile(r"^(func|type|var|const)\b"),
+    (".rs",): re.compile(
+        r"^\s*(pub(\([\w:]+\))?\s+)?(async\s+)?(unsafe\s+)?"
+        r"(fn|struct|enum|trait|impl|mod|type|const|static|macro_rules!)\b"
+    ),
+    (".java", ".cs", ".kt", ".scala"): re.compile(
+        r"^\s*((public|private|protected|internal|static|abstract|final|sealed|"
+        r"override|open|data|suspend)\s+)*"
+        r"(?!(return|throw|new|if|else|for|while|switch|catch|case)\b)"
+        r"(class|interface|enum|record|object|fun|def|\w[\w<>\[\],.? ]*\s+\w+\s*\()"
+        # Statements end in ";", declarations do not
+        r"(?!.*;\s*$)"
+    ),
+    (".c", ".h", ".cpp", ".hpp", ".cc", ".cxx"): re.compile(
+        r"^(struct|class|enum|union|typedef|namespace|template|#define)\b"
+        r"|^[A-Za-z_][\w\s\*&:<>,]*\([^;]*\)\s*(const\s*)?\{?\s*$"
+    ),
+    (".rb",): re.compile(r"^\s*(class|module|def)\b"),
+    (".php",): re.compile(
+        r"^\s*((abstract|final|public|private|protected|static)\s+)*"
+        r"(class|interface|trait|function|enum)\b"
+    ),
+}
+
+
+def outline_by_pattern(content, pattern):
+    """Keep only the lines that look like definitions, without trailing braces."""
+    return "\n".join(
+        line.rstrip().rstrip("{").rstrip()
+        for line in content.splitlines()
+        if pattern.search(line)
+    )
+
+
+def content_digest(content):
+    """Return a hex digest identifying a piece of text."""
+    return hashlib.sha1(content.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+# Outline results keyed by (extension, content hash), so unchanged files are
+# never parsed twice in one session
+OUTLINE_CACHE_SIZE = 4096
+_outline_cache = {}
+
+
+def outline_transform(file_path, content):
+    """Reduce a source file to its top-level definitions.
+
+    Python is parsed with ast; other known languages use OUTLINE_PATTERNS.
+    Files in other languages, or that fail to parse, are returned unchanged.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    key = (ext, content_digest(content))
+    if key in _outline_cache:
+        return _outline_cache[key]
+
+    outline = content
+    if ext in (".py", ".pyw", ".pyi"):
+        try:
+            outline = outline_python(content)
+        except (SyntaxError, ValueError):
+            pass
+    else:
+        for extensions, pattern in OUTLINE_PATTERNS.items():
+            if ext in extensions:
+                outline = outline_by_pattern(content, pattern)
+                break
+
+    if len(_outline_cache) >= OUTLINE_CACHE_SIZE:
+        _outline_cache.clear()
+    _outline_cache[key] = outline
+    return outline
+
+
+# Post-read content transforms, keyed by the name shown in the UI. Each takes
+# (file_path, content) and returns the new content. They must be module-level
+# functions so they can be sent to worker processes.
+CONTENT_TRANSFORMS = {
+    "Strip trailing whitespace": strip_trailing_whitespace,
+    "Collapse blank lines": collapse_blank_lines,
+    "Outline (signatures only)": outline_transform,
+}
+
+NO_TRANSFORM = "None"
+
+# Limits for one process-pool task; batching many small files per task
+# keeps the pickling and IPC overhead small relative to the work
+TRANSFORM_BATCH_FILES = 64
+TRANSFORM_BATCH_CHARS = 1024 * 1024
+
+# Below this many files a process pool costs more than it saves
+PROCESS_POOL_MIN_FILES = 32
+
+
+def iter_batches(
+    items, max_files=TRANSFORM_BATCH_FILES, max_chars=TRANSFORM_BATCH_CHARS
+):
+    """Group (path, content) items into batches bounded by count and size."""
+    batch = []
+    batch_chars = 0
+    for item in items:
+        batch.append(item)
+        batch_chars += len(item[1])
+        if len(batch) >= max_files or batch_chars >= max_chars:
+            yield batch
+            batch = []
+            batch_chars = 0
+    if batch:
+        yield batch
+
+
+def transform_batch(batch, transforms):
+    """Apply each transform in order to every (path, content) item in a batch."""
+    results = []
+    for file_path, content in batch:
+        for transform in transforms:
+            content = transform(file_path, content)
+        results.append((file_path, content))
+    return results
+
+
+def run_transforms(items, transforms, use_processes=False, max_workers=None):
+    """Run the post-read transform stage over (path, content) items.
+
+    With use_processes the batches are spread over a process pool, which
+    sidesteps the GIL for CPU-heavy transforms. Output order always matches
+    input order.
+    """
+    if not transforms:
+        return list(items)
+
+    if not use_processes or len(items) < PROCESS_POOL_MIN_FILES:
+        return transform_batch(items, transforms)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        batches = pool.map(
+            transform_batch,
+            iter_batches(items),
+            itertools.repeat(transforms),
+        )
+        for batch in batches:
+            results.extend(batch)
+    return results
+
+
+class ContentFilter:
+    """Include/exclude content patterns evaluated while a file is read.
+
+    Patterns are matched line by line. A file is kept when it matches at
+    least one include pattern (if any are given) and no exclude pattern.
+    Reading stops at the first exclude match, and include patterns are no
+    longer checked once one has matched.
+    """
+
+    def __init__(self, include=(), exclude=(), use_regex=False):
+        self.include = [self.compile(pattern, use_regex) for pattern in include]
+        self.exclude = [self.compile(pattern, use_regex) for pattern in exclude]
+
+    @staticmethod
+    def compile(pattern, use_regex):
+        try:
+            return re.compile(pattern if use_regex else re.escape(pattern))
+        except re.error as e:
+            raise ValueError(f"Invalid content pattern {pattern!r}: {e}")
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    def read(self, lines):
+        """Consume an iterable of lines; return the content or None if filtered out."""
+        included = not self.include
+        kept = []
+        for line in lines:
+            for pattern in self.exclude:
+                if pattern.search(line):
+                    return None
+            if not included:
+                included = any(pattern.search(line) for pattern in self.include)
+                if included and not self.exclude:
+                    # Nothing left to check, take the rest of the file as is
+                    kept.append(line)
+                    kept.extend(lines)
+                    break
+            kept.append(line)
+        return "".join(kept) if included else None
+
+
+def parse_content_patterns(text, use_regex):
+    """Split a pattern field: comma-separated literals, or one regular expression."""
+    if use_regex:
+        return [text] if text.strip() else []
+    return [pattern.strip() for pattern in text.split(",") if pattern.strip()]
+
+
+# Byte order marks and the codec that decodes the text after them. UTF-32
+# comes first because its little-endian BOM starts with UTF-16's.
+BYTE_ORDER_MARKS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le", "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be", "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8", "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le", "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be", "utf-16-be"),
+]
+
+# Files are read in chunks of this size; the first chunk is used to detect
+# the encoding
+READ_CHUNK_SIZE = 64 * 1024
+
+# Legacy single-byte encodings tried, in order, when UTF-8 fails
+FALLBACK_ENCODINGS = ["cp1252", "latin-1"]
+
+
+def looks_like_text(data, codec):
+    """Check that data decodes with codec to mostly printable characters."""
+    try:
+        text = data.decode(codec)
+    except UnicodeDecodeError:
+        return False
+    return mostly_printable(text)
+
+
+def mostly_printable(text):
+    printable = sum(1 for ch in text if ch.isprintable() or ch in "\t\n\r")
+    return printable >= len(text) * 0.95
+
+
+def detect_encoding(prefix):
+    """Guess the encoding of a file from its first bytes.
+
+    Returns (codec, bom_length, label) where label is the name counted in
+    the scan stats. codec is None for binary content.
+    """
+    for bom, codec, label in BYTE_ORDER_MARKS:
+        if prefix.startswith(bom):
+            return codec, len(bom), label
+
+    if b"\0" in prefix:
+        # UTF-16 text without a BOM has a NUL in every other byte for ASCII
+        half = len(prefix) // 2
+        even_nuls = prefix[0::2].count(0)
+        odd_nuls = prefix[1::2].count(0)
+        codec = None
+        if even_nuls == 0 and odd_nuls > half * 0.3:
+            codec = "utf-16-le"
+        elif odd_nuls == 0 and even_nuls > half * 0.3:
+            codec = "utf-16-be"
+        if codec and looks_like_text(prefix[: half * 2], codec):
+            return codec, 0, codec
+        return None, 0, "binary"
+
+    try:
+        prefix.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the end of the prefix is fine
+        if e.start < len(prefix) - 3:
+            # Legacy encodings decode almost any bytes, so only accept them
+            # for text that reads as text
+            for codec in FALLBACK_ENCODINGS:
+                if looks_like_text(prefix, codec):
+                    return codec, 0, codec
+            return None, 0, "binary"
+    return "utf-8", 0, "utf-8"
+
+
+def decode_bytes(data, codec):
+    """Decode a whole buffer, falling back to legacy encodings.
+
+    Returns (text, codec actually used), with newlines normalized to \\n,
+    or (None, "binary") when only a legacy encoding decodes data and the
+    result is not mostly printable.
+    """
+    for candidate in [codec] + [c for c in FALLBACK_ENCODINGS if c != codec]:
+        try:
+            text = data.decode(candidate)
+        except UnicodeDecodeError:
+            continue
+        if candidate in FALLBACK_ENCODINGS and not mostly_printable(text):
+            continue
+        return text.replace("\r\n", "\n").replace("\r", "\n"), candidate
+    return None, "binary"
+
+
+def iter_decoded_lines(first_chunk, file, codec, raw):
+    """Yield decoded lines of a file, reading and decoding it incrementally.
+
+    Every chunk read is also appended to raw, so a caller that hits a
+    decoding error can fall back to another codec without reading again.
+    """
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(codec)(), translate=True
+    )
+    pending = ""
+    chunk = first_chunk
+    while chunk:
+        text = pending + decoder.decode(chunk)
+        lines = text.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        chunk = file.read(READ_CHUNK_SIZE)
+        raw.extend(chunk)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def decode_file(file, content_filter=None):
+    """Read a binary file object once and decode it.
+
+    The encoding is detected from the first chunk (BOM, UTF-16 NUL pattern,
+    UTF-8 validity) and the bytes are decoded without re-opening the file.
+    With a content_filter the text is fed to it line by line as it is
+    decoded, so excluded files stop being read at the first match.
+
+    Returns (content, label); content is None for files the filter rejects.
+    """
+    first_chunk = file.read(READ_CHUNK_SIZE)
+    codec, bom_length, label = detect_encoding(first_chunk)
+
+    if codec is None:
+        if content_filter and content_filter.include:
+            return None, label
+        size = len(first_chunk)
+        for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), b""):
+            size += len(chunk)
+        return f"[Binary content - {size} bytes]", label
+
+    if not content_filter:
+        data = first_chunk + file.read()
+        content, used = decode_bytes(data[bom_length:], codec)
+        if content is None:
+            return f"[Binary content - {len(data)} bytes]", used
+        return content, label if used == codec else used
+
+    raw = bytearray(first_chunk)
+    try:
+        lines = iter_decoded_lines(first_chunk[bom_length:], file, codec, raw)
+        return content_filter.read(lines), label
+    except UnicodeDecodeError:
+        # The prefix looked like UTF-8 but later bytes are not; finish
+        # reading into the same buffer and decode it as a legacy encoding
+        raw.extend(file.read())
+        content, used = decode_bytes(bytes(raw[bom_length:]), FALLBACK_ENCODINGS[0])
+        if content is None:
+            if content_filter.include:
+                return None, used
+            return f"[Binary content - {len(raw)} bytes]", used
+        return content_filter.read(io.StringIO(content)), used
+
+
+def stat_and_read(open_file, record, content_filter=None):
+    """Stat a file record, then read and decode it, as one blocking call.
+
+    Returns (error, content, encoding). If the stat fails, error is its
+    message and nothing is read. On a remote filesystem this lets one worker
+    do both round trips for a file back to back, with no wait for a stat
+    pass over every other file in between.
+    """
+    error = stat_record(record)
+    if error is not None:
+        return error, None, None
+    content, encoding = read_and_decode(open_file, record.path, content_filter)
+    return None, content, encoding
+
+
+def read_and_decode(open_file, file_path, content_filter=None):
+    """Open file_path with open_file and decode it into (content, encoding).
+
+    Errors are returned as the content with an encoding of None rather than
+    raised, so reads can run on worker threads.
+    """
+    try:
+        with open_file(file_path) as file:
+            return decode_file(file, content_filter)
+    except Exception as e:
+        return f"Error reading file: {str(e)}", None
+
+
+# Delay before the preview follows an output option edit
+LIVE_PREVIEW_DELAY_MS = 250
+
+# Delay before the file tree follows the search box
+SEARCH_DELAY_MS = 120
+
+# Most matching files the tree shows at once; the status bar counts the rest
+SEARCH_MAX_ROWS = 500
+
+
+class PathMatcher:
+    """Case-insensitive search over a fixed list of paths.
+
+    The lowercased paths are joined once into a single newline-separated
+    string with a table of line start offsets. A query is split into
+    whitespace-separated terms that must all occur in a path. The rarest
+    term is located first: when it is rare, with str.find over the joined
+    string and offsets bisected back to paths, otherwise with one pass over
+    the lowered paths. The other terms are only checked on those candidates.
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.lowered = [path.lower().replace("\n", " ") for path in self.paths]
+        self.text = "\n".join(self.lowered) + "\n"
+        self.starts = [0]
+        for path in self.lowered:
+            self.starts.append(self.starts[-1] + len(path) + 1)
+
+    def search(self, query):
+        """Return the sorted indices of the paths matching every query term."""
+        terms = set(query.lower().split())
+        if not terms:
+            return list(range(len(self.paths)))
+
+        # Start from the rarest term; counting runs at C speed
+        counts = {term: self.text.count(term) for term in terms}
+        first = min(terms, key=counts.get)
+        if counts[first] * 8 < len(self.paths):
+            # Few hits: jump between them through the joined string
+            matches = []
+            position = self.text.find(first)
+            while position != -1:
+                index = bisect.bisect_right(self.starts, position) - 1
+                matches.append(index)
+                # Continue on the next line; one hit per path is enough
+                position = self.text.find(first, self.starts[index + 1])
+        else:
+            matches = [
+                index for index, path in enumerate(self.lowered) if first in path
+            ]
+
+        for term in sorted(terms - {first}, key=counts.get):
+            matches = [index for index in matches if term in self.lowered[index]]
+        return matches
+
+
+# Rough characters-per-token ratio used for token estimates
+CHARS_PER_TOKEN = 4
+
+
+def format_size(size):
+    """Format a character count the way the status bar shows it."""
+    if size > 1024 * 1024:
+        return f"{size/(1024*1024):.1f} MB"
+    if size > 1024:
+        return f"{size/1024:.1f} KB"
+    return f"{size:,} characters"
+
+
+def render_directory_tree(files, index):
+    """Render the layout of (path, content) files as an indented tree.
+
+    Built purely from the scan index, which supplies the parent of every
+    path, so no filesystem calls are made. Each directory shows how many of
+    the files it holds, their total size and an estimated token count.
+    """
+    children = {}
+    totals = {}  # path -> [file count, characters]
+
+    def add_child(parent, path):
+        siblings = children.setdefault(parent, {})
+        siblings[path] = None  # dict keeps first-seen order
+
+    def parent_of(path):
+        record = index.get(path)
+        return index.parent_of(record) if record else None
+
+    for file_path, content in files:
+        size = len(content)
+        totals[file_path] = [1, size]
+        path = file_path
+        parent = parent_of(path)
+        # Climb through indexed directories up to the root
+        while parent is not None:
+            add_child(parent, path)
+            total = totals.setdefault(parent, [0, 0])
+            total[0] += 1
+            total[1] += size
+            if parent not in index.by_path:
+                break  # Reached a root
+            path = parent
+            parent = parent_of(path)
+
+    def describe(path, name):
+        count, size = totals[path]
+        details = f"{format_size(size)}, ~{size // CHARS_PER_TOKEN:,} tokens"
+        if path in children:
+            noun = "file" if count == 1 else "files"
+            return f"{name} ({count} {noun}, {details})"
+        return f"{name} ({details})"
+
+    lines = []
+
+    def render(path, indent):
+        entries = list(children.get(path, ()))
+        for index, child in enumerate(entries):
+            last = index == len(entries) - 1
+            name = os.path.basename(child) + ("/" if child in children else "")
+            branch = "└── " if last else "├── "
+            lines.append(indent + branch + describe(child, name))
+            render(child, indent + ("    " if last else "│   "))
+
+    # Top-level parents are the scan roots (or the folders of single files)
+    for root in [parent for parent in children if parent not in index.by_path]:
+        lines.append(describe(root, root))
+        render(root, "")
+    return "\n".join(lines)
+
+
+# What an emit contains, relative to the previous bundle
+FULL_OUTPUT = "Full bundle"
+CHANGED_OUTPUT = "Changed files only"
+DIFF_OUTPUT = "Unified diffs of changes"
+OUTPUT_MODES = [FULL_OUTPUT, CHANGED_OUTPUT, DIFF_OUTPUT]
+
+
+def bundle_fingerprint(files, previous=None):
+    """Fingerprint (path, content) files as {path: (digest, content)}.
+
+    Content that is the very same string as in the previous fingerprint
+    (the file was not read again since) reuses its digest unhashed.
+    """
+    previous = previous or {}
+    fingerprint = {}
+    for path, content in files:
+        old = previous.get(path)
+        if old is not None and old[1] is content:
+            fingerprint[path] = old
+        else:
+            fingerprint[path] = (content_digest(content), content)
+    return fingerprint
+
+
+def unified_diff(path, old, new):
+    """Return a unified diff of two versions of a file, as git would print it.
+
+    old is None for an added file and new is None for a removed one.
+    """
+    import difflib
+
+    lines = []
+    for line in difflib.unified_diff(
+        (old or "").splitlines(keepends=True),
+        (new or "").splitlines(keepends=True),
+        fromfile="/dev/null" if old is None else path,
+        tofile="/dev/null" if new is None else path,
+    ):
+        if not line.endswith("\n"):
+            line += "\n\\ No newline at end of file\n"
+        lines.append(line)
+    return "".join(lines)
+
+
+def bundle_changes(files, fingerprint, previous, as_diff=False):
+    """Return what changed in files since the previous fingerprint.
+
+    Returns (changed, removed): changed holds the (path, content) files
+    that were added or modified, compared by digest, with the content
+    replaced by a unified diff when as_diff is set; removed lists the
+    paths of the previous bundle that are gone. With as_diff, removed
+    files are also included in changed as diffs against nothing.
+    """
+    changed = []
+    for path, content in files:
+        old = previous.get(path)
+        if old is not None and old[0] == fingerprint[path][0]:
+            continue
+        if as_diff:
+            content = unified_diff(path, old[1] if old else None, content)
+        changed.append((path, content))
+
+    removed = [path for path in previous if path not in fingerprint]
+    if as_diff:
+        changed.extend(
+            (path, unified_diff(path, previous[path][1], None)) for path in removed
+        )
+    return changed, removed
+
+
+# Bump when the session layout changes incompatibly
+SESSION_VERSION = 2
+SESSION_EXTENSION = ".fcsession"
+
+
+def save_session_file(session_path, session):
+    """Write a session dict as gzip-compressed compact JSON."""
+    session = dict(session, version=SESSION_VERSION)
+    with gzip.open(session_path, "wt", encoding="utf-8") as file:
+        json.dump(session, file, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_session_file(session_path):
+    """Read a session written by save_session_file."""
+    with gzip.open(session_path, "rt", encoding="utf-8") as file:
+        session = json.load(file)
+    if session.get("version") != SESSION_VERSION:
+        raise ValueError(
+            f"Unsupported session version {session.get('version')!r} "
+            f"(expected {SESSION_VERSION})"
+        )
+    return session
+
+
+def index_to_session_entries(index):
+    """Flatten an index into session entries.
+
+    Each entry is [path, kind, parent path, size, mtime_ns, selected,
+    content]. Files that were filtered out are left out.
+    """
+    return [
+        [
+            record.path,
+            record.kind,
+            index.parent_of(record),
+            record.size,
+            record.mtime_ns,
+            record.selected,
+            record.content,
+        ]
+        for record in index
+        if record.kind == DIRECTORY or record.content is not None
+    ]
+
+
+def index_from_session_entries(entries):
+    """Rebuild a FileIndex from index_to_session_entries output."""
+    index = FileIndex()
+    for path, kind, parent, size, mtime_ns, selected, content in entries:
+        record = index.add(path, FILE if kind == FILE else DIRECTORY, parent)
+        record.size = size
+        record.mtime_ns = mtime_ns
+        record.selected = selected
+        record.content = content
+    return index
+
+
+def stale_records(records):
+    """Validate file records read earlier against the filesystem.
+
+    Files whose size and mtime still match keep their content and deleted
+    files lose it (so they are no longer listed). Changed files get their
+    new size and mtime and are returned so the caller can re-read them.
+    Records with an mtime of -1 did not come from the filesystem (e.g. a
+    git revision or an archive member) and are kept as they are.
+    """
+    stale = []
+    for record in records:
+        if record.mtime_ns == -1:
+            continue
+        try:
+            stat = os.stat(record.path)
+        except OSError:
+            record.content = None
+            continue
+        if (stat.st_size, stat.st_mtime_ns) != (record.size, record.mtime_ns):
+            record.size = stat.st_size
+            record.mtime_ns = stat.st_mtime_ns
+            stale.append(record)
+    return stale
 
 
 class GoogleStyleFileCopyApp:
@@ -195,8 +1848,6 @@ class GoogleStyleFileCopyApp:
         self.create_path_section(self.main_frame)
         self.create_options_section(self.main_frame)
         self.create_action_section(self.main_frame)
-        self.create_file_selection_section(self.main_frame)
-        self.create_preview_section(self.main_frame)
 
         # Status bar - Bubbly style
         status_frame = ttk.Frame(self.main_frame)
@@ -214,15 +1865,29 @@ class GoogleStyleFileCopyApp:
         )
         status_bar.pack(fill=tk.X, side=tk.BOTTOM)
 
-        # Store multiple file paths and data
-        self.file_paths = []
-        self.file_data = []
+        # Store scan results
+        self.index = FileIndex()
+        self.encoding_counts = Counter()
         self.file_positions = {}
+        self.pinned_paths = []
+        self.change_times = {}
+        self.change_times_index = None
+        self.last_bundle = None
+
+        # The file list and preview are built once the window is on screen.
+        # Idle callbacks run in order, so the window is mapped first, and
+        # they are packed above the status bar, which is packed at the bottom.
+        self.root.after_idle(self.create_deferred_sections)
+
+    def create_deferred_sections(self):
+        """Build the sections that are not needed for the first paint."""
+        self.create_file_selection_section(self.main_frame)
+        self.create_preview_section(self.main_frame)
 
     def create_path_section(self, parent):
         # Bubbly style heading
         path_heading = ttk.Label(
-            parent, text="Select File or Directory", style="Header.TLabel"
+            parent, text="Select Files or Directories", style="Header.TLabel"
         )
         path_heading.pack(anchor=tk.W, pady=(0, 10))  # Reduced padding
 
@@ -236,6 +1901,9 @@ class GoogleStyleFileCopyApp:
         )  # Reduced padding
 
         self.path_var = tk.StringVar()
+        # Roots picked with the browse buttons, used as picked while the field
+        # still shows them, since POSIX paths may contain ROOT_SEPARATOR
+        self.browsed_roots = []
         path_entry = ttk.Entry(
             entry_container,
             textvariable=self.path_var,
@@ -262,7 +1930,15 @@ class GoogleStyleFileCopyApp:
             command=self.browse_directory,
             style="TButton",
         )
-        browse_dir_btn.pack(side=tk.LEFT)
+        browse_dir_btn.pack(side=tk.LEFT, padx=(0, 10))
+
+        add_dir_btn = ttk.Button(
+            button_frame,
+            text="Add Directory",
+            command=self.add_directory,
+            style="TButton",
+        )
+        add_dir_btn.pack(side=tk.LEFT)
 
     def create_options_section(self, parent):
         # Bubbly style heading
@@ -296,6 +1972,23 @@ class GoogleStyleFileCopyApp:
             row=1, column=0, sticky=tk.W, padx=10, pady=8
         )  # Reduced padding
 
+        self.tree_header_var = tk.BooleanVar(value=False)
+        tree_header_check = ttk.Checkbutton(
+            options_frame,
+            text="Include directory tree header",
+            variable=self.tree_header_var,
+        )
+        tree_header_check.grid(row=9, column=0, sticky=tk.W, padx=10, pady=8)
+
+        # Overlap stats and reads on network filesystems (NFS, SSHFS, ...)
+        self.async_io_var = tk.BooleanVar(value=False)
+        async_io_check = ttk.Checkbutton(
+            options_frame,
+            text="Overlap file I/O (network drives)",
+            variable=self.async_io_var,
+        )
+        async_io_check.grid(row=10, column=0, sticky=tk.W, padx=10, pady=8)
+
         # File type ignore option
         ignore_label = ttk.Label(
             options_frame,
@@ -332,6 +2025,41 @@ class GoogleStyleFileCopyApp:
             row=4, column=0, sticky=tk.W, padx=10, pady=(0, 8)
         )  # Reduced padding
 
+        # Where the file list comes from: a directory walk or git
+        source_label = ttk.Label(
+            options_frame,
+            text="File source:",
+            foreground=self.colors["text_secondary"],
+        )
+        source_label.grid(row=5, column=0, sticky=tk.W, padx=10, pady=(8, 2))
+
+        self.source_var = tk.StringVar(value=FILESYSTEM_SOURCE)
+        source_combo = ttk.Combobox(
+            options_frame,
+            textvariable=self.source_var,
+            values=FILE_SOURCES,
+            state="readonly",
+            width=20,
+            font=("Helvetica", 12),
+        )
+        source_combo.grid(row=6, column=0, sticky=tk.W, padx=10, pady=(0, 4))
+
+        git_ref_label = ttk.Label(
+            options_frame,
+            text="Git ref (for changed files and revision):",
+            foreground=self.colors["text_secondary"],
+        )
+        git_ref_label.grid(row=7, column=0, sticky=tk.W, padx=10, pady=(8, 2))
+
+        self.git_ref_var = tk.StringVar(value="HEAD")
+        git_ref_entry = ttk.Entry(
+            options_frame,
+            textvariable=self.git_ref_var,
+            width=20,
+            font=("Helvetica", 12),
+        )
+        git_ref_entry.grid(row=8, column=0, sticky=tk.W, padx=10, pady=(0, 8))
+
         # Delimiter options with better alignment
         prefix_label = ttk.Label(
             options_frame,
@@ -373,6 +2101,135 @@ class GoogleStyleFileCopyApp:
             row=1, column=2, padx=10, pady=8, sticky=tk.W
         )  # Reduced padding
 
+        # Output format selection
+        format_label = ttk.Label(
+            options_frame,
+            text="Output format:",
+            foreground=self.colors["text_secondary"],
+        )
+        format_label.grid(row=2, column=1, sticky=tk.E, padx=10, pady=8)
+
+        self.output_format_var = tk.StringVar(value=DelimitedFormatter.name)
+        format_combo = ttk.Combobox(
+            options_frame,
+            textvariable=self.output_format_var,
+            values=list(OUTPUT_FORMATTERS),
+            state="readonly",
+            width=13,
+            font=("Helvetica", 12),
+        )
+        format_combo.grid(row=2, column=2, padx=10, pady=8, sticky=tk.W)
+
+        # Post-read content transform
+        transform_label = ttk.Label(
+            options_frame,
+            text="Content transform:",
+            foreground=self.colors["text_secondary"],
+        )
+        transform_label.grid(row=3, column=1, sticky=tk.E, padx=10, pady=8)
+
+        self.transform_var = tk.StringVar(value=NO_TRANSFORM)
+        transform_combo = ttk.Combobox(
+            options_frame,
+            textvariable=self.transform_var,
+            values=[NO_TRANSFORM] + list(CONTENT_TRANSFORMS),
+            state="readonly",
+            width=13,
+            font=("Helvetica", 12),
+        )
+        transform_combo.grid(row=3, column=2, padx=10, pady=8, sticky=tk.W)
+
+        self.process_pool_var = tk.BooleanVar(value=False)
+        process_pool_check = ttk.Checkbutton(
+            options_frame,
+            text="Run transforms on all CPU cores",
+            variable=self.process_pool_var,
+        )
+        process_pool_check.grid(
+            row=4, column=1, columnspan=2, sticky=tk.E, padx=10, pady=8
+        )
+
+        # Content filters, applied while files are read
+        include_label = ttk.Label(
+            options_frame,
+            text="Only files containing:",
+            foreground=self.colors["text_secondary"],
+        )
+        include_label.grid(row=5, column=1, sticky=tk.E, padx=10, pady=8)
+
+        self.include_content_var = tk.StringVar(value="")
+        include_entry = ttk.Entry(
+            options_frame,
+            textvariable=self.include_content_var,
+            width=15,
+            font=("Helvetica", 12),
+        )
+        include_entry.grid(row=5, column=2, padx=10, pady=8, sticky=tk.W)
+
+        exclude_label = ttk.Label(
+            options_frame,
+            text="Skip files containing:",
+            foreground=self.colors["text_secondary"],
+        )
+        exclude_label.grid(row=6, column=1, sticky=tk.E, padx=10, pady=8)
+
+        self.exclude_content_var = tk.StringVar(value="")
+        exclude_entry = ttk.Entry(
+            options_frame,
+            textvariable=self.exclude_content_var,
+            width=15,
+            font=("Helvetica", 12),
+        )
+        exclude_entry.grid(row=6, column=2, padx=10, pady=8, sticky=tk.W)
+
+        self.content_regex_var = tk.BooleanVar(value=False)
+        content_regex_check = ttk.Checkbutton(
+            options_frame,
+            text="Content patterns are regular expressions",
+            variable=self.content_regex_var,
+        )
+        content_regex_check.grid(
+            row=7, column=1, columnspan=2, sticky=tk.E, padx=10, pady=8
+        )
+
+        # Order of the emitted files
+        order_label = ttk.Label(
+            options_frame,
+            text="Order files by:",
+            foreground=self.colors["text_secondary"],
+        )
+        order_label.grid(row=8, column=1, sticky=tk.E, padx=10, pady=8)
+
+        self.order_var = tk.StringVar(value=PATH_ORDER)
+        order_combo = ttk.Combobox(
+            options_frame,
+            textvariable=self.order_var,
+            values=list(ORDER_STRATEGIES),
+            state="readonly",
+            width=22,
+            font=("Helvetica", 12),
+        )
+        order_combo.grid(row=8, column=2, padx=10, pady=8, sticky=tk.W)
+
+        # Everything, or only what changed since the last copy
+        output_mode_label = ttk.Label(
+            options_frame,
+            text="Output:",
+            foreground=self.colors["text_secondary"],
+        )
+        output_mode_label.grid(row=9, column=1, sticky=tk.E, padx=10, pady=8)
+
+        self.output_mode_var = tk.StringVar(value=FULL_OUTPUT)
+        output_mode_combo = ttk.Combobox(
+            options_frame,
+            textvariable=self.output_mode_var,
+            values=OUTPUT_MODES,
+            state="readonly",
+            width=22,
+            font=("Helvetica", 12),
+        )
+        output_mode_combo.grid(row=9, column=2, padx=10, pady=8, sticky=tk.W)
+
     def create_action_section(self, parent):
         action_frame = ttk.Frame(parent)
         action_frame.pack(fill=tk.X, pady=(0, 15))  # Reduced padding
@@ -390,6 +2247,22 @@ class GoogleStyleFileCopyApp:
         )
         clear_btn.pack(side=tk.LEFT)
 
+        load_session_btn = ttk.Button(
+            action_frame,
+            text="Load Session",
+            command=self.load_session,
+            style="TButton",
+        )
+        load_session_btn.pack(side=tk.RIGHT)
+
+        save_session_btn = ttk.Button(
+            action_frame,
+            text="Save Session",
+            command=self.save_session,
+            style="TButton",
+        )
+        save_session_btn.pack(side=tk.RIGHT, padx=(0, 10))
+
     def create_file_selection_section(self, parent):
         # Bubbly style heading
         file_heading = ttk.Label(parent, text="File Selection", style="Header.TLabel")
@@ -416,7 +2289,58 @@ class GoogleStyleFileCopyApp:
             command=self.deselect_all_files,
             style="TButton",
         )
-        deselect_all_btn.pack(side=tk.LEFT)
+        deselect_all_btn.pack(side=tk.LEFT, padx=(0, 10))
+
+        pin_btn = ttk.Button(
+            controls_frame,
+            text="Pin to Top",
+            command=self.toggle_pin,
+            style="TButton",
+        )
+        pin_btn.pack(side=tk.LEFT)
+
+        # Search box that filters the tree as you type
+        check_matches_btn = ttk.Button(
+            controls_frame,
+            text="Check All Matches",
+            command=self.check_all_matches,
+            style="TButton",
+        )
+        check_matches_btn.pack(side=tk.RIGHT)
+
+        self.search_status_var = tk.StringVar(value="")
+        search_status = ttk.Label(
+            controls_frame,
+            textvariable=self.search_status_var,
+            foreground=self.colors["text_secondary"],
+            font=("Helvetica", 10),
+        )
+        search_status.pack(side=tk.RIGHT, padx=10)
+
+        search_container = ttk.Frame(controls_frame, style="Card.TFrame", padding=2)
+        search_container.pack(side=tk.RIGHT, padx=(10, 0))
+
+        self.search_var = tk.StringVar(value="")
+        search_entry = ttk.Entry(
+            search_container,
+            textvariable=self.search_var,
+            width=30,
+            font=("Helvetica", 12),
+        )
+        search_entry.pack(fill=tk.BOTH, expand=True, padx=5)
+
+        self.path_matcher = None
+        self.path_matcher_index = None
+        self.search_matches = None
+        self.search_job = None
+        self.search_var.trace_add("write", self.schedule_search)
+
+        # Index the tree items were built from (records hold their item ids),
+        # the items the search filled with matches, with whether they were
+        # open before, and the matched items
+        self.tree_index = FileIndex()
+        self.filtered_items = {}
+        self.match_items = []
 
         # File list with bubbly styling
         tree_frame = ttk.Frame(file_list_frame, style="Card.TFrame")
@@ -441,6 +2365,7 @@ class GoogleStyleFileCopyApp:
         self.file_tree.column("checked", width=60, anchor=tk.CENTER)
         self.file_tree.column("path", width=600)
         self.file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.file_tree.tag_configure("match", background=self.colors["accent_light"])
 
         file_list_scrollbar.config(command=self.file_tree.yview)
 
@@ -450,9 +2375,6 @@ class GoogleStyleFileCopyApp:
         # Bind click event for selection to scroll preview
         self.file_tree.bind("<<TreeviewSelect>>", self.scroll_to_file_in_preview)
 
-        # Store directory structure
-        self.directory_structure = {}
-
     def create_preview_section(self, parent):
         # Bubbly style heading
         preview_heading = ttk.Label(parent, text="Preview", style="Header.TLabel")
@@ -497,6 +2419,20 @@ class GoogleStyleFileCopyApp:
         )
         self.highlight_tag_configured = True
 
+        # Keep the preview in step with the output options
+        self.preview_runs = []
+        self.preview_files = None
+        self.preview_refresh_job = None
+        for var in (
+            self.prefix_delimiter_var,
+            self.suffix_delimiter_var,
+            self.show_paths_var,
+            self.output_format_var,
+            self.tree_header_var,
+            self.order_var,
+        ):
+            var.trace_add("write", self.schedule_preview_refresh)
+
     def toggle_checkbox(self, event):
         item = self.file_tree.identify_row(event.y)
         column = self.file_tree.identify_column(event.x)
@@ -506,19 +2442,15 @@ class GoogleStyleFileCopyApp:
 
         current_value = self.file_tree.item(item, "values")[0]
         # Use more visible, bubbly checkbox indicators
-        new_value = "☐" if current_value == "☑" else "☑"
-        values = list(self.file_tree.item(item, "values"))
-        values[0] = new_value
-        self.file_tree.item(item, values=values)
+        checked = current_value != "☑"
+        self.set_checked(item, checked)
 
         # If it's a directory, update all children
         if self.file_tree.get_children(item):
 
             def update_children(parent_item):
                 for child in self.file_tree.get_children(parent_item):
-                    child_values = list(self.file_tree.item(child, "values"))
-                    child_values[0] = new_value
-                    self.file_tree.item(child, values=child_values)
+                    self.set_checked(child, checked)
                     update_children(child)
 
             update_children(item)
@@ -581,72 +2513,81 @@ class GoogleStyleFileCopyApp:
             # Add highlighting tag
             self.preview_text.tag_add("highlight", f"{start_line}.0", f"{end_line}.0")
 
+    def set_checked(self, item, checked):
+        """Set the checkbox of a tree item and the selection of its record."""
+        values = list(self.file_tree.item(item, "values"))
+        values[0] = "☑" if checked else "☐"
+        self.file_tree.item(item, values=values)
+        record = self.index.get(values[1])
+        if record:
+            record.selected = checked
+
+    def set_all_checked(self, checked):
+        def update(parent_item):
+            for item in self.file_tree.get_children(parent_item):
+                self.set_checked(item, checked)
+                update(item)
+
+        update("")
+
     def select_all_files(self):
-        for item in self.file_tree.get_children():
-            values = list(self.file_tree.item(item, "values"))
-            values[0] = "☑"
-            self.file_tree.item(item, values=values)
+        self.set_all_checked(True)
 
     def deselect_all_files(self):
-        for item in self.file_tree.get_children():
-            values = list(self.file_tree.item(item, "values"))
-            values[0] = "☐"
-            self.file_tree.item(item, values=values)
+        self.set_all_checked(False)
 
     def browse_file(self):
         file_paths = filedialog.askopenfilenames(title="Select file(s)")
         if file_paths:
-            self.file_paths = file_paths
-            if len(file_paths) == 1:
-                self.path_var.set(file_paths[0])
-            else:
-                self.path_var.set(f"Selected {len(file_paths)} files")
+            self.set_roots(file_paths)
 
     def browse_directory(self):
         dir_path = filedialog.askdirectory(title="Select a directory")
         if dir_path:
-            self.file_paths = []  # Clear any selected files
-            self.path_var.set(dir_path)
+            self.set_roots([dir_path])
 
-    def read_file(self, file_path):
-        """Read and return the contents of a file."""
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                return file.read()
-        except UnicodeDecodeError:
-            try:
-                # Try reading as binary if utf-8 fails
-                with open(file_path, "rb") as file:
-                    binary_content = file.read()
-                    return f"[Binary content - {len(binary_content)} bytes]"
-            except Exception as e:
-                return f"Error reading file: {str(e)}"
-        except Exception as e:
-            return f"Error reading file: {str(e)}"
+    def add_directory(self):
+        """Add another directory to the roots already in the path field."""
+        dir_path = filedialog.askdirectory(title="Add a directory")
+        if dir_path:
+            roots = self.get_roots()
+            if dir_path not in roots:
+                roots.append(dir_path)
+            self.set_roots(roots)
+
+    def set_roots(self, roots):
+        """Show a list of root paths in the path field."""
+        self.browsed_roots = list(roots)
+        self.path_var.set(f"{ROOT_SEPARATOR} ".join(roots))
+
+    def get_roots(self):
+        """Return the root paths in the path field.
+
+        Roots set with set_roots are returned as they were given, so a path
+        containing ROOT_SEPARATOR stays whole; text the user typed or edited
+        is split with parse_roots.
+        """
+        text = self.path_var.get()
+        if self.browsed_roots and text == f"{ROOT_SEPARATOR} ".join(self.browsed_roots):
+            return list(self.browsed_roots)
+        return parse_roots(text)
+
+    def open_file(self, file_path):
+        """Open a scanned file for binary reading.
+
+        Files that do not live on disk (e.g. git revision content) are served
+        by the opener of their record.
+        """
+        record = self.index.get(file_path)
+        if record and record.opener:
+            return record.opener()
+        return open(file_path, "rb")
 
     def should_ignore_file(self, file_path):
         """Check if a file should be ignored based on its name or extension."""
-        file_name = os.path.basename(file_path)
-
-        # Always ignore .DS_Store and .env files
-        if file_name in [".DS_Store", ".env", ".env.local"]:
-            return True
-
-        # Get extensions to ignore from user input
-        ignore_extensions = [
-            ext.strip() for ext in self.ignore_types_var.get().split(",") if ext.strip()
-        ]
-
-        # Check if the file's extension should be ignored
-        file_ext = os.path.splitext(file_name)[1].lower()
-        for ext in ignore_extensions:
-            # Ensure the extension starts with a dot
-            if not ext.startswith("."):
-                ext = "." + ext
-            if file_ext == ext.lower():
-                return True
-
-        return False
+        return is_ignored_file(
+            file_path, parse_ignore_extensions(self.ignore_types_var.get())
+        )
 
     def select_directory(self):
         """Select or deselect all files in the currently selected directory."""
@@ -659,210 +2600,137 @@ class GoogleStyleFileCopyApp:
         item_values = self.file_tree.item(selected_item, "values")
 
         # Get current state of the directory checkbox
-        current_state = item_values[0]
-        new_state = "☐" if current_state == "☑" else "☑"
+        checked = item_values[0] != "☑"
 
         # Update the selected directory
-        values = list(item_values)
-        values[0] = new_state
-        self.file_tree.item(selected_item, values=values)
+        self.set_checked(selected_item, checked)
 
         # Update all child items (files and subdirectories)
         def update_children(item):
             for child in self.file_tree.get_children(item):
-                child_values = list(self.file_tree.item(child, "values"))
-                child_values[0] = new_state
-                self.file_tree.item(child, values=child_values)
+                self.set_checked(child, checked)
                 update_children(child)
 
         update_children(selected_item)
 
-    def process_directory(self, directory_path):
-        """Process all files in a directory and return their contents."""
-        files_to_process = []
-        self.directory_structure = {}  # Reset directory structure
-
-        if self.recursive_var.get():
-            for root, dirs, files in os.walk(directory_path):
-                # Skip __pycache__ directories
-                if "__pycache__" in dirs:
-                    dirs.remove("__pycache__")
-
-                # Skip other common directories to ignore
-                for ignore_dir in [
-                    ".git",
-                    ".hcl",
-                    ".zip",
-                    ".svn",
-                    ".hg",
-                    "__pycache__",
-                    "node_modules",
-                ]:
-                    if ignore_dir in dirs:
-                        dirs.remove(ignore_dir)
-
-                # Add directories to the structure
-                for dir_name in dirs:
-                    dir_path = os.path.join(root, dir_name)
-                    self.directory_structure[dir_path] = {
-                        "type": "Directory",
-                        "parent": root,
-                    }
-
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if not self.should_ignore_file(file_path):
-                        files_to_process.append(file_path)
-                        self.directory_structure[file_path] = {
-                            "type": "File",
-                            "parent": root,
-                        }
-        else:
-            for item in os.listdir(directory_path):
-                # Skip __pycache__ directories
-                if item == "__pycache__":
-                    continue
+    def get_files_to_scan(self, archives):
+        """Scan the roots in the path field and return a FileIndex (or None).
+
+        Archives left open to serve their members are appended to archives,
+        for the caller to close once the files are read.
+        """
+        roots = self.get_roots()
 
-                item_path = os.path.join(directory_path, item)
-                if os.path.isdir(item_path):
-                    self.directory_structure[item_path] = {
-                        "type": "Directory",
-                        "parent": directory_path,
-                    }
-                elif os.path.isfile(item_path) and not self.should_ignore_file(
-                    item_path
-                ):
-                    files_to_process.append(item_path)
-                    self.directory_structure[item_path] = {
-                        "type": "File",
-                        "parent": directory_path,
-                    }
-
-        return files_to_process
-
-    def get_files_to_scan(self):
-        """Get the list of files to scan based on user selection."""
-        path = self.path_var.get().strip()
-
-        if not path and not self.file_paths:
+        if not roots:
             messagebox.showerror(
                 "Error", "Please enter or select a file/directory path", icon="error"
             )
-            return []
+            return None
 
-        # Check if we have multiple files selected
-        if self.file_paths and len(self.file_paths) > 1:
-            # Process multiple files
-            return self.file_paths
-        else:
-            # Single file or directory path
-            if path.startswith("Selected ") and " files" in path:
-                # We have multiple files but need to use the stored paths
-                return self.file_paths
-            else:
-                # Regular single path processing
-                if not os.path.exists(path):
-                    messagebox.showerror("Error", "Path does not exist", icon="error")
-                    return []
-                if os.path.isdir(path):
-                    return self.process_directory(path)
-                else:
-                    return [path]
+        missing = [root for root in roots if not os.path.exists(root)]
+        if missing:
+            messagebox.showerror(
+                "Error", "Path does not exist:\n" + "\n".join(missing), icon="error"
+            )
+            return None
+
+        walk = walk_root
+        blobs = {}
+        executor = None
+        source = self.source_var.get()
+        if source != FILESYSTEM_SOURCE:
+            walk = functools.partial(
+                git_walk_root,
+                source=source,
+                ref=self.git_ref_var.get().strip() or "HEAD",
+                blobs=blobs,
+            )
+        elif self.async_io_var.get():
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Roots are walked side by side, each on its own event loop, so
+            # they share one pool to keep a single limit on calls in flight
+            executor = ThreadPoolExecutor(max_workers=ASYNC_IO_CONCURRENCY)
+            walk = functools.partial(async_walk_root, executor=executor)
+        openers = {}
+        walk = functools.partial(
+            archive_walk_root, openers=openers, archives=archives, walk=walk
+        )
+
+        # Ignore rules are read once here so walker threads never touch Tk
+        try:
+            index = scan_roots(
+                roots,
+                self.recursive_var.get(),
+                parse_ignore_extensions(self.ignore_types_var.get()),
+                walk=walk,
+            )
+        except ValueError as e:
+            for archive in archives:
+                archive.close()
+            messagebox.showerror("Error", str(e), icon="error")
+            return None
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # Revision content is served from memory instead of the working tree
+        for file_path, data in blobs.items():
+            index.get(file_path).opener = functools.partial(io.BytesIO, data)
+        # Archive members are read in place
+        for file_path, opener in openers.items():
+            index.get(file_path).opener = opener
+        return index
 
     def process_path(self):
         """Process path and handle files based on whether files have been scanned already."""
-        # Check if we have already scanned files (file_data is populated)
-        if self.file_data:
+        # Check if we have already scanned files
+        if self.index.loaded_files():
             self.process_selected_files()
         else:
             self.scan_and_process_files()
 
     def scan_and_process_files(self):
         """Scan the files, populate the file list, and copy all files in one go."""
-        path = self.path_var.get().strip()
-
-        if not path and not self.file_paths:
-            messagebox.showerror(
-                "Error", "Please enter or select a file/directory path", icon="error"
-            )
+        # Check the content patterns before walking anything
+        try:
+            self.get_content_filter()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), icon="error")
             return
 
-        # Clear existing file list
-        for item in self.file_tree.get_children():
-            self.file_tree.delete(item)
-
         # Get files to scan
-        files_to_scan = self.get_files_to_scan()
+        archives = []
+        index = self.get_files_to_scan(archives)
 
-        if not files_to_scan:
+        if not index:
             return
 
-        # Clear file data
-        self.file_data = []
-        errors = []
+        self.index = index
+        self.encoding_counts = Counter()
+        self.search_matches = None
+        self.search_var.set("")
 
-        # Create a mapping of paths to tree items
-        path_to_item = {}
+        # Stat (so sessions can detect stale content), read and transform
+        candidates = [
+            record
+            for record in index.files()
+            if not self.should_ignore_file(record.path)
+        ]
+        errors = self.load_file_contents(candidates, stat=True)
+        scanned = len(candidates) - len(errors)
 
-        # First, add directories to the tree
-        for dir_path, info in self.directory_structure.items():
-            if info["type"] == "Directory":
-                parent = info["parent"]
-                if parent == path:  # Root directory
-                    item = self.file_tree.insert(
-                        "",
-                        "end",
-                        text=os.path.basename(dir_path),
-                        values=["☑", dir_path],
-                    )
-                else:
-                    parent_item = path_to_item.get(parent)
-                    if parent_item:
-                        item = self.file_tree.insert(
-                            parent_item,
-                            "end",
-                            text=os.path.basename(dir_path),
-                            values=["☑", dir_path],
-                        )
-                    else:
-                        item = self.file_tree.insert(
-                            "",
-                            "end",
-                            text=os.path.basename(dir_path),
-                            values=["☑", dir_path],
-                        )
-                path_to_item[dir_path] = item
-
-        # Then process all files
-        for file_path in files_to_scan:
-            if not self.should_ignore_file(file_path):
-                try:
-                    # Read file content
-                    content = self.read_file(file_path)
-                    # Add to file data
-                    self.file_data.append((file_path, content))
-
-                    # Add to treeview with checkbox
-                    parent = self.directory_structure[file_path]["parent"]
-                    parent_item = path_to_item.get(parent)
-                    if parent_item:
-                        self.file_tree.insert(
-                            parent_item,
-                            "end",
-                            text=os.path.basename(file_path),
-                            values=["☑", file_path],
-                        )
-                    else:
-                        self.file_tree.insert(
-                            "",
-                            "end",
-                            text=os.path.basename(file_path),
-                            values=["☑", file_path],
-                        )
-                except Exception as e:
-                    errors.append((file_path, str(e)))
-
-        if not self.file_data:
+        # Files served from memory or an archive are never read again (their
+        # mtime is -1), so drop the buffered bytes and close the archives
+        for record in index.files():
+            record.opener = None
+        for archive in archives:
+            archive.close()
+        loaded = index.loaded_files()
+
+        self.populate_file_tree()
+
+        if not loaded:
             if errors:
                 error_msg = "No files were processed. Errors:\n"
                 for file_path, error in errors:
@@ -876,8 +2744,17 @@ class GoogleStyleFileCopyApp:
         self.process_all_files()
 
         # Update status and button text
+        filtered = scanned - len(loaded)
+        encodings = ", ".join(
+            f"{encoding} {count}"
+            for encoding, count in self.encoding_counts.most_common()
+        )
+        # Add scan details to the status left by the copy, which knows
+        # whether everything or only the changes were copied
         self.status_var.set(
-            f"✓ Copied {len(self.file_data)} files to clipboard. Uncheck files you don't want and click again to reprocess."
+            self.status_var.get()
+            + (f" ({filtered} files skipped by content filters)" if filtered else "")
+            + f" Encodings: {encodings}."
         )
         self.process_btn.config(text="Reprocess Selected Files")
 
@@ -887,68 +2764,515 @@ class GoogleStyleFileCopyApp:
                 error_msg += f"\n{file_path}: {error}"
             messagebox.showwarning("Warnings", error_msg, icon="warning")
 
+    def get_transforms(self):
+        """Return the content transforms chosen in the Options section."""
+        transform = CONTENT_TRANSFORMS.get(self.transform_var.get())
+        return (transform,) if transform else ()
+
+    def get_content_filter(self):
+        """Build the ContentFilter from the Options section.
+
+        Raises ValueError for an invalid regular expression.
+        """
+        use_regex = self.content_regex_var.get()
+        return ContentFilter(
+            include=parse_content_patterns(self.include_content_var.get(), use_regex),
+            exclude=parse_content_patterns(self.exclude_content_var.get(), use_regex),
+            use_regex=use_regex,
+        )
+
+    def map_file_io(self, function, items):
+        """Apply a blocking file operation to items, concurrently if enabled."""
+        if self.async_io_var.get():
+            return map_async_io(function, items)
+        return [function(item) for item in items]
+
+    def load_file_contents(self, records, stat=False):
+        """Run the read and transform stages, storing content on each record.
+
+        Files rejected by the content filters are left with content None.
+        With stat, each file is stat'ed in the same call that reads it, and
+        files that cannot be stat'ed are skipped; returns their (path,
+        error message) pairs.
+        """
+        content_filter = self.get_content_filter()
+        if stat:
+            load = functools.partial(
+                stat_and_read, self.open_file, content_filter=content_filter
+            )
+            results = self.map_file_io(load, records)
+        else:
+            read = functools.partial(
+                read_and_decode, self.open_file, content_filter=content_filter
+            )
+            paths = [record.path for record in records]
+            results = [(None, *result) for result in self.map_file_io(read, paths)]
+
+        errors = []
+        loaded = []
+        for record, (error, content, encoding) in zip(records, results):
+            if error is not None:
+                errors.append((record.path, error))
+                continue
+            record.content = content
+            if encoding is not None:
+                self.encoding_counts[encoding] += 1
+            # Binary and error placeholders are not source text, so they
+            # bypass the transforms (an outline would reduce them to nothing)
+            if content is not None and encoding not in (None, "binary"):
+                loaded.append(record)
+
+        transformed = run_transforms(
+            [(record.path, record.content) for record in loaded],
+            self.get_transforms(),
+            use_processes=self.process_pool_var.get(),
+        )
+        for record, (_, content) in zip(loaded, transformed):
+            record.content = content
+        return errors
+
+    def populate_file_tree(self):
+        """Rebuild the file Treeview from the scan index.
+
+        Items are created once per scan and their ids kept on the records;
+        the search filters them with filter_file_tree instead of rebuilding.
+        """
+        self.clear_file_tree()
+        self.tree_index = self.index
+        pinned = set(self.pinned_paths)
+        slots = itertools.count()
+
+        def insert(record):
+            # Items whose parent is a root (or not in the tree) go at the top level
+            parent = self.tree_parent(record)
+            record.item = self.file_tree.insert(
+                parent.item if parent else "",
+                "end",
+                text=self.tree_item_text(record.path, pinned),
+                values=["☑" if record.selected else "☐", record.path],
+            )
+            record.slot = next(slots)
+
+        def insert_directory(record):
+            # Overlapping roots can list a directory before its parent, so
+            # make sure the parent is in the tree first
+            parent = self.index.get(self.index.parent_of(record))
+            if parent and parent.kind == DIRECTORY and parent.item is None:
+                insert_directory(parent)
+            insert(record)
+
+        # First, add directories to the tree
+        for record in self.index:
+            if record.kind == DIRECTORY and record.item is None:
+                insert_directory(record)
+
+        # Then add all files
+        for record in self.index.loaded_files():
+            insert(record)
+
+    def clear_file_tree(self):
+        """Delete every tree item, including ones hidden by the search."""
+        # Hidden items are detached from their parents, so reattach them first
+        self.filter_file_tree(None)
+        for item in self.file_tree.get_children():
+            self.file_tree.delete(item)
+        for record in self.tree_index:
+            record.item = None
+        self.tree_index = FileIndex()
+
+    def tree_item_text(self, path, pinned):
+        """Return the tree label of a path, marked if it is in the pinned set."""
+        name = os.path.basename(path)
+        return f"📌 {name}" if path in pinned else name
+
+    def tree_parent(self, record):
+        """Return the record whose tree item a record sits under, or None."""
+        parent = self.tree_index.get(self.tree_index.parent_of(record))
+        return parent if parent is not None and parent.item is not None else None
+
+    def tree_children(self, parent_items):
+        """Return the unfiltered child items of the given tree items.
+
+        Children are found from the records' parent ids in one pass over the
+        tree's index and put back in insertion order.
+        """
+        index = self.tree_index
+        parents = {}
+        for parent_id, parent_path in enumerate(index.parent_paths):
+            parent = index.get(parent_path)
+            item = "" if parent is None or parent.item is None else parent.item
+            if item in parent_items:
+                parents[parent_id] = item
+
+        children = {item: [] for item in parent_items}
+        for record in index:
+            if record.item is not None and record.parent in parents:
+                children[parents[record.parent]].append(record)
+        return {
+            item: [record.item for record in sorted(records, key=lambda r: r.slot)]
+            for item, records in children.items()
+        }
+
+    def filter_file_tree(self, paths):
+        """Show only the given file paths and their directories, or everything.
+
+        Existing items are re-parented with set_children, which detaches the
+        children it leaves out, so Tk only redraws the paths shown and the
+        parents of the previous filter. Directories the filter expanded get
+        back their previous open state. With paths None the unfiltered tree
+        is restored.
+        """
+        tree = self.file_tree
+        for item in self.match_items:
+            tree.item(item, tags=())
+        if self.filtered_items:
+            children = self.tree_children(self.filtered_items)
+            for item, was_open in self.filtered_items.items():
+                tree.set_children(item, *children[item])
+                if item:
+                    tree.item(item, open=was_open)
+        self.match_items = []
+        self.filtered_items = {}
+        if paths is None:
+            return
+
+        # Children to show under each parent, climbing from every path until
+        # an ancestor that is already being shown
+        shown = {"": []}
+        for path in paths:
+            record = self.tree_index.get(path)
+            tree.item(record.item, tags=("match",))
+            self.match_items.append(record.item)
+            while True:
+                parent = self.tree_parent(record)
+                parent_item = parent.item if parent else ""
+                known = parent_item in shown
+                shown.setdefault(parent_item, []).append(record)
+                if known:
+                    break
+                record = parent
+
+        for parent_item, records in shown.items():
+            records.sort(key=lambda record: record.slot)
+            tree.set_children(parent_item, *(record.item for record in records))
+            was_open = False
+            if parent_item:
+                was_open = tree.tk.getboolean(tree.item(parent_item, "open"))
+                tree.item(parent_item, open=True)
+            self.filtered_items[parent_item] = was_open
+
+    def get_path_matcher(self):
+        """Return the PathMatcher for the current scan, building it on first use."""
+        if self.path_matcher is None or self.path_matcher_index is not self.index:
+            self.path_matcher = PathMatcher(
+                record.path for record in self.index.loaded_files()
+            )
+            self.path_matcher_index = self.index
+        return self.path_matcher
+
+    def schedule_search(self, *args):
+        """Filter the tree shortly after the search box changes."""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self.apply_search)
+
+    def apply_search(self):
+        """Show only the files matching the search box, or everything when empty."""
+        self.search_job = None
+        query = self.search_var.get().strip()
+
+        if not query:
+            if self.search_matches is not None:
+                self.search_matches = None
+                self.search_status_var.set("")
+                self.filter_file_tree(None)
+            return
+
+        # Time the whole filter, including the redraw of the tree
+        matcher = self.get_path_matcher()
+        start = time.perf_counter()
+        matches = [matcher.paths[index] for index in matcher.search(query)]
+        self.filter_file_tree(matches[:SEARCH_MAX_ROWS])
+        self.file_tree.update_idletasks()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.search_matches = matches
+        shown = (
+            f", showing {SEARCH_MAX_ROWS:,}" if len(matches) > SEARCH_MAX_ROWS else ""
+        )
+        self.search_status_var.set(
+            f"{len(matches):,} matches{shown} ({elapsed_ms:.0f} ms)"
+        )
+
+    def check_all_matches(self):
+        """Check every file matched by the current search."""
+        if not self.search_matches:
+            return
+        for path in self.search_matches:
+            self.index.get(path).selected = True
+            self.file_tree.item(self.index.get(path).item, values=["☑", path])
+
+    def toggle_pin(self):
+        """Pin or unpin the selected file, or the files of the selected directory.
+
+        Pinned files are emitted first, in the order they were pinned.
+        Selecting something that is already fully pinned unpins it.
+        """
+        selected_items = self.file_tree.selection()
+        if not selected_items:
+            messagebox.showinfo(
+                "Info", "Please select a file or directory first", icon="info"
+            )
+            return
+
+        path = self.file_tree.item(selected_items[0], "values")[1]
+        if self.index.get(path).kind == DIRECTORY:
+            prefix = os.path.join(path, "")
+            records = [
+                record
+                for record in self.index.loaded_files()
+                if record.path.startswith(prefix)
+            ]
+            paths = [record.path for record in sort_records(records, PATH_ORDER)]
+        else:
+            paths = [path]
+
+        pinned = set(self.pinned_paths)
+        if all(path in pinned for path in paths):
+            unpinned = set(paths)
+            self.pinned_paths = [
+                path for path in self.pinned_paths if path not in unpinned
+            ]
+        else:
+            self.pinned_paths.extend(path for path in paths if path not in pinned)
+
+        # Only the labels of the affected files change
+        pinned = set(self.pinned_paths)
+        for path in paths:
+            self.file_tree.item(
+                self.index.get(path).item, text=self.tree_item_text(path, pinned)
+            )
+        self.schedule_preview_refresh()
+
+    def get_change_times(self):
+        """Return full path -> last commit time for the git roots of the scan.
+
+        Computed once per scan. Roots outside a git checkout are skipped, and
+        their files fall back to mtime order.
+        """
+        if self.change_times_index is not self.index:
+            self.change_times = {}
+            for root in self.get_roots():
+                if is_archive(root):
+                    continue
+                cwd = root if os.path.isdir(root) else os.path.dirname(root) or "."
+                try:
+                    times = git_change_times(cwd)
+                except ValueError:
+                    continue
+                for rel_path, changed in times.items():
+                    self.change_times[os.path.join(cwd, rel_path)] = changed
+            self.change_times_index = self.index
+        return self.change_times
+
+    def ordered_files(self, records):
+        """Return (path, content) pairs for records in the chosen output order."""
+        strategy = self.order_var.get()
+        change_times = self.get_change_times() if strategy == GIT_ORDER else None
+        return [
+            (record.path, record.content)
+            for record in sort_records(
+                records, strategy, self.pinned_paths, change_times
+            )
+        ]
+
     def process_all_files(self):
         """Process all scanned files and copy to clipboard."""
-        prefix_delimiter = self.prefix_delimiter_var.get()
-        suffix_delimiter = self.suffix_delimiter_var.get()
-        show_file_paths = self.show_paths_var.get()
+        self.emit_files(
+            self.ordered_files(self.index.loaded_files()),
+            "Uncheck files you don't want and click again to reprocess.",
+        )
 
-        self.preview_text.delete(1.0, tk.END)
+    def create_formatter(self):
+        """Create the output formatter chosen in the Options section."""
+        formatter_class = OUTPUT_FORMATTERS.get(
+            self.output_format_var.get(), DelimitedFormatter
+        )
+        return formatter_class(
+            prefix_delimiter=self.prefix_delimiter_var.get(),
+            suffix_delimiter=self.suffix_delimiter_var.get(),
+            show_paths=self.show_paths_var.get(),
+        )
 
-        try:
-            all_content = ""
-            # Store positions for each file in the preview for navigation
-            self.file_positions = {}
-            current_position = 0
-
-            # Filter out directories from file_data
-            actual_files = [
-                (path, content)
-                for path, content in self.file_data
-                if os.path.isfile(path)
-            ]
+    def format_runs(self, files):
+        """Format (path, content) files into runs for the preview.
+
+        Returns (runs, positions): runs is a list of (tag, text) with
+        consecutive chunks of the same tag merged, matching how the Text
+        widget groups tag ranges, and positions maps each path to the
+        character offset where its section starts.
+        """
+        formatter = self.create_formatter()
+        runs = []
+        positions = {}
+        current_position = 0
+
+        def write(chunks):
+            nonlocal current_position
+            for text, tag in chunks:
+                if runs and runs[-1][0] == tag:
+                    runs[-1][1].append(text)
+                else:
+                    runs.append((tag, [text]))
+                current_position += len(text)
+
+        write(formatter.begin())
+        if self.tree_header_var.get():
+            tree = render_directory_tree(files, self.index)
+            write(formatter.format_tree(tree))
+        for file_path, content in files:
+            # Store the starting position of this file in the preview
+            positions[file_path] = current_position
+            write(formatter.format_file(file_path, content))
+        write(formatter.end())
+        runs = [
+            (tag, parts[0] if len(parts) == 1 else "".join(parts))
+            for tag, parts in runs
+        ]
+        return runs, positions
 
-            for file_path, content in actual_files:
-                # Store the starting position of this file in the preview
-                self.file_positions[file_path] = current_position
+    def render_preview(self, files):
+        """Show files in the preview, updating it in place when possible.
 
-                # Insert with syntax highlighting
-                if show_file_paths:
-                    self.preview_text.insert(tk.END, file_path, "file_path")
-                    self.preview_text.insert(tk.END, "\n\n")
-                    current_position += len(file_path) + 2  # +2 for newlines
-                    all_content += f"{file_path}\n\n"
+        When only tagged runs (paths and delimiters) differ from what is on
+        screen, just those ranges are replaced; file contents already in the
+        widget are left alone. Returns the full output text.
+        """
+        runs, positions = self.format_runs(files)
+        old_runs = self.preview_runs
 
-                self.preview_text.insert(tk.END, f"{prefix_delimiter}\n", "delimiter")
-                current_position += len(prefix_delimiter) + 1
-                all_content += f"{prefix_delimiter}\n"
+        same_layout = len(old_runs) == len(runs) and all(
+            old_tag == tag and (tag or old_text is text or old_text == text)
+            for (old_tag, old_text), (tag, text) in zip(old_runs, runs)
+        )
+        if same_layout:
+            ranges = {}
+            seen = Counter()
+            edits = []
+            for (tag, old_text), (_, text) in zip(old_runs, runs):
+                if not tag:
+                    continue
+                number = seen[tag]
+                seen[tag] += 1
+                if old_text != text:
+                    if tag not in ranges:
+                        ranges[tag] = self.preview_text.tag_ranges(tag)
+                    start, end = ranges[tag][2 * number : 2 * number + 2]
+                    edits.append((start, end, text, tag))
+            # Edit from the end so earlier ranges keep their positions
+            for start, end, text, tag in reversed(edits):
+                self.preview_text.delete(start, end)
+                self.preview_text.insert(start, text, tag)
+        else:
+            self.preview_text.delete(1.0, tk.END)
+            for tag, text in runs:
+                if tag:
+                    self.preview_text.insert(tk.END, text, tag)
+                else:
+                    self.preview_text.insert(tk.END, text)
 
-                self.preview_text.insert(tk.END, content + "\n")
-                current_position += len(content) + 1
-                all_content += content + "\n"
+        self.preview_runs = runs
+        self.preview_files = files
+        self.file_positions = positions
+        return "".join(text for _, text in runs)
 
-                self.preview_text.insert(tk.END, f"{suffix_delimiter}\n\n", "delimiter")
-                current_position += len(suffix_delimiter) + 2
-                all_content += f"{suffix_delimiter}\n\n"
+    def schedule_preview_refresh(self, *args):
+        """Re-render the preview shortly after an output option changes.
+
+        Rapid edits (typing a delimiter) are coalesced into one refresh.
+        """
+        if self.preview_files is None:
+            return
+        if self.preview_refresh_job is not None:
+            self.root.after_cancel(self.preview_refresh_job)
+        self.preview_refresh_job = self.root.after(
+            LIVE_PREVIEW_DELAY_MS, self.refresh_preview
+        )
+
+    def refresh_preview(self):
+        """Re-render the last output from content already in memory."""
+        self.preview_refresh_job = None
+        if self.preview_files is None:
+            return
+        # Re-apply the output order, which may be what changed, keeping the
+        # content shown (e.g. diffs); files no longer scanned go last
+        contents = dict(self.preview_files)
+        records = [self.index.get(path) for path in contents]
+        order = [path for path, _ in self.ordered_files(filter(None, records))]
+        order += [path for path, record in zip(contents, records) if record is None]
+        try:
+            self.render_preview([(path, contents[path]) for path in order])
+        except Exception as e:
+            self.status_var.set(f"Could not update preview: {str(e)}")
+            return
+        self.status_var.set(
+            "Preview updated. Click 'Reprocess Selected Files' to copy it."
+        )
+
+    def emit_files(self, files, status_hint):
+        """Render (path, content) pairs to the preview and copy them to clipboard.
+
+        Every emit is fingerprinted. In the changed-files and diff output
+        modes only what differs from the previous fingerprint is emitted.
+        """
+        fingerprint = bundle_fingerprint(files, self.last_bundle)
+        if self.last_bundle is not None:
+            # Unchecked files are left out, not removed, so they keep the
+            # state they were last bundled in
+            for path, entry in self.last_bundle.items():
+                record = self.index.get(path)
+                if path not in fingerprint and record and record.content is not None:
+                    fingerprint[path] = entry
+        mode = self.output_mode_var.get()
+        change_note = ""
+        if mode != FULL_OUTPUT and self.last_bundle is not None:
+            changed, removed = bundle_changes(
+                files, fingerprint, self.last_bundle, as_diff=mode == DIFF_OUTPUT
+            )
+            if not changed:
+                message = "No files changed since the last bundle" + (
+                    f" ({len(removed)} removed)." if removed else "."
+                )
+                self.status_var.set(message)
+                messagebox.showinfo("Info", message, icon="info")
+                self.last_bundle = fingerprint
+                return
+            noun = "file" if len(removed) == 1 else "files"
+            change_note = " Only changes since the last bundle" + (
+                f" ({len(removed)} {noun} removed)." if removed else "."
+            )
+            files = changed
+
+        try:
+            all_content = self.render_preview(files)
+            import pyperclip
 
             pyperclip.copy(all_content)
+            self.last_bundle = fingerprint
 
             # Enhanced status message with file count and total size
             total_size = len(all_content)
-            size_str = f"{total_size:,} characters"
-            if total_size > 1024:
-                size_str = f"{total_size/1024:.1f} KB"
-            if total_size > 1024 * 1024:
-                size_str = f"{total_size/(1024*1024):.1f} MB"
+            size_str = format_size(total_size)
 
             self.status_var.set(
-                f"✓ Copied {len(actual_files)} files ({size_str}) to clipboard. Uncheck files you don't want and click again to reprocess."
+                f"✓ Copied {len(files)} files ({size_str}) to clipboard."
+                f"{change_note} {status_hint}"
             )
 
             # Show message box with feedback
             messagebox.showinfo(
                 "Success",
-                f"Successfully copied {len(actual_files)} files ({size_str}) to clipboard!",
+                f"Successfully copied {len(files)} files ({size_str}) to clipboard!",
                 icon="info",
             )
 
@@ -957,101 +3281,141 @@ class GoogleStyleFileCopyApp:
 
     def process_selected_files(self):
         """Process only the checked files and copy their content to clipboard."""
-        # Get selected files from treeview
-        selected_files = []
-
-        def get_checked_files(item):
-            values = self.file_tree.item(item, "values")
-            if values[0] == "☑":  # Checked
-                file_path = values[1]
-                if os.path.isfile(file_path):
-                    selected_files.append(file_path)
-            # Check children recursively
-            for child in self.file_tree.get_children(item):
-                get_checked_files(child)
-
-        # Start checking from root items
-        for item in self.file_tree.get_children():
-            get_checked_files(item)
-
-        if not selected_files:
+        # Checkbox changes are mirrored on the records, so no tree walk is needed
+        records = [record for record in self.index.loaded_files() if record.selected]
+        if self.output_mode_var.get() != FULL_OUTPUT and self.last_bundle is not None:
+            # Pick up edits made on disk since the scan, reading only the
+            # files whose size or mtime moved; deleted files drop out
+            self.load_file_contents(stale_records(records))
+            records = [record for record in records if record.content is not None]
+        selected_data = self.ordered_files(records)
+
+        if not selected_data:
             messagebox.showinfo("Info", "No files selected for copying", icon="info")
             return
 
-        # Filter file data to include only selected files
-        selected_data = [
-            (path, content)
-            for path, content in self.file_data
-            if path in selected_files
-        ]
+        self.emit_files(
+            selected_data,
+            "Click 'Process and Copy' again to update selection.",
+        )
 
-        prefix_delimiter = self.prefix_delimiter_var.get()
-        suffix_delimiter = self.suffix_delimiter_var.get()
-        show_file_paths = self.show_paths_var.get()
+    def option_vars(self):
+        """Return the Options section variables saved with a session, by name."""
+        return {
+            "recursive": self.recursive_var,
+            "show_paths": self.show_paths_var,
+            "ignore_types": self.ignore_types_var,
+            "prefix_delimiter": self.prefix_delimiter_var,
+            "suffix_delimiter": self.suffix_delimiter_var,
+            "output_format": self.output_format_var,
+            "transform": self.transform_var,
+            "process_pool": self.process_pool_var,
+            "async_io": self.async_io_var,
+            "include_content": self.include_content_var,
+            "exclude_content": self.exclude_content_var,
+            "content_regex": self.content_regex_var,
+            "source": self.source_var,
+            "git_ref": self.git_ref_var,
+            "tree_header": self.tree_header_var,
+            "order": self.order_var,
+            "output_mode": self.output_mode_var,
+        }
 
-        self.preview_text.delete(1.0, tk.END)
+    def save_session(self):
+        """Save the scan, options and selection so they can be restored later."""
+        if not self.index.loaded_files():
+            messagebox.showinfo(
+                "Info", "Scan some files before saving a session", icon="info"
+            )
+            return
+
+        session_path = filedialog.asksaveasfilename(
+            title="Save session",
+            defaultextension=SESSION_EXTENSION,
+            filetypes=[("File Copier session", f"*{SESSION_EXTENSION}")],
+        )
+        if not session_path:
+            return
+
+        session = {
+            "path": self.path_var.get(),
+            "roots": self.get_roots(),
+            "options": {name: var.get() for name, var in self.option_vars().items()},
+            "pinned": self.pinned_paths,
+            "entries": index_to_session_entries(self.index),
+        }
 
         try:
-            all_content = ""
-            # Store positions for each file in the preview for navigation
-            self.file_positions = {}
-            current_position = 0
-
-            for file_path, content in selected_data:
-                # Store the starting position of this file in the preview
-                self.file_positions[file_path] = current_position
-
-                # Insert with syntax highlighting
-                if show_file_paths:
-                    self.preview_text.insert(tk.END, file_path, "file_path")
-                    self.preview_text.insert(tk.END, "\n\n")
-                    current_position += len(file_path) + 2  # +2 for newlines
-                    all_content += f"{file_path}\n\n"
-
-                self.preview_text.insert(tk.END, f"{prefix_delimiter}\n", "delimiter")
-                current_position += len(prefix_delimiter) + 1
-                all_content += f"{prefix_delimiter}\n"
-
-                self.preview_text.insert(tk.END, content + "\n")
-                current_position += len(content) + 1
-                all_content += content + "\n"
-
-                self.preview_text.insert(tk.END, f"{suffix_delimiter}\n\n", "delimiter")
-                current_position += len(suffix_delimiter) + 2
-                all_content += f"{suffix_delimiter}\n\n"
+            save_session_file(session_path, session)
+        except Exception as e:
+            messagebox.showerror(
+                "Error", f"Could not save session: {str(e)}", icon="error"
+            )
+            return
 
-            pyperclip.copy(all_content)
+        file_count = len(self.index.loaded_files())
+        self.status_var.set(
+            f"✓ Saved session with {file_count} files to {session_path}"
+        )
 
-            # Enhanced status message with file count and total size
-            total_size = len(all_content)
-            size_str = f"{total_size:,} characters"
-            if total_size > 1024:
-                size_str = f"{total_size/1024:.1f} KB"
-            if total_size > 1024 * 1024:
-                size_str = f"{total_size/(1024*1024):.1f} MB"
+    def load_session(self):
+        """Restore a saved session without rescanning unchanged files."""
+        session_path = filedialog.askopenfilename(
+            title="Load session",
+            filetypes=[("File Copier session", f"*{SESSION_EXTENSION}")],
+        )
+        if not session_path:
+            return
 
-            self.status_var.set(
-                f"✓ Copied {len(selected_data)} files ({size_str}) to clipboard! Click 'Process and Copy' again to update selection."
+        try:
+            session = load_session_file(session_path)
+        except Exception as e:
+            messagebox.showerror(
+                "Error", f"Could not load session: {str(e)}", icon="error"
             )
+            return
 
-            # Show message box with feedback
-            messagebox.showinfo(
-                "Success",
-                f"Successfully copied {len(selected_data)} files ({size_str}) to clipboard!",
-                icon="info",
-            )
+        self.clear_all()
 
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}", icon="error")
+        if "roots" in session:
+            self.set_roots(session["roots"])
+        else:
+            self.path_var.set(session["path"])
+        option_vars = self.option_vars()
+        for name, value in session["options"].items():
+            if name in option_vars:
+                option_vars[name].set(value)
+
+        self.pinned_paths = list(session.get("pinned", []))
+
+        # Only files whose size or mtime changed are read again
+        self.index = index_from_session_entries(session["entries"])
+        stale = stale_records(self.index.files())
+        try:
+            self.load_file_contents(stale)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), icon="error")
+            return
+
+        self.populate_file_tree()
+        self.process_btn.config(text="Reprocess Selected Files")
+        self.status_var.set(
+            f"✓ Restored {len(self.index.loaded_files())} files from session ({len(stale)} changed files re-read). Click 'Reprocess Selected Files' to copy."
+        )
 
     def clear_all(self):
         self.path_var.set("")
-        self.file_paths = []
-        self.file_data = []
+        self.index = FileIndex()
+        self.encoding_counts = Counter()
         self.preview_text.delete(1.0, tk.END)
+        self.preview_runs = []
+        self.preview_files = None
+        self.search_matches = None
+        self.search_var.set("")
+        self.pinned_paths = []
+        self.last_bundle = None
         self.status_var.set("")
-        for item in self.file_tree.get_children():
-            self.file_tree.delete(item)
+        self.clear_file_tree()
         # Reset the button text
         self.process_btn.config(text="Process and Copy")
 
@@ -0,0 +1,111 @@
+"""Time the scan pipeline on a simulated high-latency filesystem.
+
+Builds a synthetic tree on local disk, then wraps os.scandir, os.stat and
+open so every call sleeps for a fixed round trip first, as on an NFS or
+SSHFS mount. The walk and the combined stat-and-read stage are timed
+serially (walk_root, then one call per file) and through the asyncio engine
+(async_walk_root and map_async_io), and both runs are checked to produce
+the same entries and contents.
+
+    python benchmarks/bench_async_io.py [--files 1000] [--latency-ms 2]
+"""
+
+import argparse
+import contextlib
+import functools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def make_tree(root, count, files_per_dir=10, dirs_per_dir=3):
+    """Create count small files spread over a tree of nested directories."""
+    directories = [root]
+    created = 0
+    while created < count:
+        parent = directories[len(directories) // dirs_per_dir]
+        directory = os.path.join(parent, f"dir{len(directories)}")
+        os.mkdir(directory)
+        directories.append(directory)
+        for _ in range(min(files_per_dir, count - created)):
+            with open(os.path.join(directory, f"file{created}.py"), "w") as file:
+                file.write(f"def function_{created}():\n    return {created}\n")
+            created += 1
+
+
+@contextlib.contextmanager
+def latency(seconds):
+    """Make os.scandir, os.stat and open_slow sleep before every call."""
+    original_scandir, original_stat = os.scandir, os.stat
+
+    def delayed(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            time.sleep(seconds)
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    os.scandir, os.stat = delayed(original_scandir), delayed(original_stat)
+    try:
+        yield delayed(functools.partial(open, mode="rb"))
+    finally:
+        os.scandir, os.stat = original_scandir, original_stat
+
+
+def run_pipeline(root, open_file, walk, map_io):
+    """Walk, stat and read root; return the entries and the read results."""
+    entries = walk(root, True, frozenset())
+    records = [app.FileRecord(path, 0, kind) for path, kind, _ in entries]
+    files = [record for record in records if record.kind == app.FILE]
+    results = map_io(functools.partial(app.stat_and_read, open_file), files)
+    assert not any(error for error, _, _ in results), results
+    return entries, results
+
+
+def serial_map(function, items):
+    return [function(item) for item in items]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=app.ASYNC_IO_CONCURRENCY)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, args.files)
+
+        with latency(args.latency_ms / 1000) as open_file:
+            start = time.perf_counter()
+            serial = run_pipeline(root, open_file, app.walk_root, serial_map)
+            serial_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            concurrent = run_pipeline(
+                root,
+                open_file,
+                functools.partial(
+                    app.async_walk_root, max_concurrency=args.concurrency
+                ),
+                functools.partial(app.map_async_io, max_concurrency=args.concurrency),
+            )
+            async_time = time.perf_counter() - start
+
+    assert serial == concurrent, "async engine produced different results"
+    print(
+        f"{args.files:,} files, {args.latency_ms:g} ms per call, "
+        f"concurrency {args.concurrency}"
+    )
+    print(f"serial     {serial_time:8.2f} s")
+    print(f"asyncio    {async_time:8.2f} s  ({serial_time / async_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
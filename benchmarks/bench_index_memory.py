@@ -0,0 +1,94 @@
+"""Measure per-entry memory of the scan index.
+
+Compares the FileIndex of slotted FileRecords with the parallel structures
+it replaced (a dict of {"type", "parent"} dicts keyed by path, a list of
+(path, content) tuples, a dict of (size, mtime) tuples and a dict of file
+tree item ids keyed by path) on a synthetic tree. Every entry gets a tree
+item in both, as after populate_file_tree. Path and item id strings are
+created up front and shared by both, so only the index overhead is
+measured.
+
+    python benchmarks/bench_index_memory.py [--entries 500000]
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def make_entries(count, files_per_dir=20):
+    """Return (path, kind, parent, item) entries for a tree of count entries."""
+    entries = []
+    directory = "/project"
+    for i in range(count):
+        if i % (files_per_dir + 1) == 0:
+            parent = directory.rsplit("/", 1)[0] if i % 7 == 0 else directory
+            directory = f"{parent or '/project'}/dir{i}"
+            entries.append((directory, app.DIRECTORY, parent or "/project"))
+        else:
+            entries.append((f"{directory}/file{i}.py", app.FILE, directory))
+    # Tree item ids, in the form Treeview generates them
+    return [entry + (f"I{i + 1:03X}",) for i, entry in enumerate(entries)]
+
+
+def build_legacy(entries):
+    structure = {}
+    file_data = []
+    file_stats = {}
+    tree_items = {}
+    for path, kind, parent, item in entries:
+        structure[path] = {"type": kind, "parent": parent}
+        tree_items[path] = item
+        if kind == app.FILE:
+            file_data.append((path, None))
+            file_stats[path] = (1234, 1700000000000000000 + len(file_stats))
+    return structure, file_data, file_stats, tree_items
+
+
+def build_index(entries):
+    index = app.FileIndex()
+    for slot, (path, kind, parent, item) in enumerate(entries):
+        record = index.add(path, kind, parent)
+        record.item = item
+        record.slot = slot
+        if kind == app.FILE:
+            record.size = 1234
+            record.mtime_ns = 1700000000000000000 + len(index)
+    return index
+
+
+def measure(build, entries):
+    tracemalloc.start()
+    result = build(entries)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=500000)
+    args = parser.parse_args()
+
+    entries = make_entries(args.entries)
+    legacy = measure(build_legacy, entries)
+    index = measure(build_index, entries)
+
+    print(f"{len(entries):,} entries")
+    print(
+        f"dicts and tuples {legacy / 1e6:8.1f} MB  {legacy / len(entries):6.1f} B/entry"
+    )
+    print(
+        f"FileIndex        {index / 1e6:8.1f} MB  {index / len(entries):6.1f} B/entry"
+    )
+    print(f"saving           {1 - index / legacy:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Time PathMatcher construction and queries on a large synthetic path list.
+
+With a display, the same queries are then run through the app's search
+box against a file tree holding every path, timing the match, the tree
+filter and the redraw together, as the status bar reports them.
+
+    python benchmarks/bench_search.py [--paths 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+WORDS = [
+    "src", "lib", "app", "core", "utils", "service", "model", "view",
+    "controller", "test", "data", "api", "client", "server", "config",
+]  # fmt: skip
+
+QUERIES = ["service1", "model view", "file9999", "Controller test .py", "zzz"]
+
+
+def make_paths(count, seed=1):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        depth = rng.randint(2, 5)
+        parts = [f"{rng.choice(WORDS)}{rng.randint(0, 50)}" for _ in range(depth)]
+        paths.append("/home/user/project/" + "/".join(parts) + f"/file{i}.py")
+    return paths
+
+
+def make_index(paths):
+    """Return a FileIndex of the paths, with their directories, as if scanned."""
+    index = app.FileIndex()
+    root = "/home/user/project"
+    for path in paths:
+        parent = os.path.dirname(path)
+        missing = []
+        while parent != root and index.get(parent) is None:
+            missing.append(parent)
+            parent = os.path.dirname(parent)
+        for directory in reversed(missing):
+            index.add(directory, app.DIRECTORY, os.path.dirname(directory))
+        index.add(path, app.FILE, os.path.dirname(path)).content = ""
+    return index
+
+
+def time_redraw(paths):
+    """Time each query through the search box, or return False without a display."""
+    try:
+        root = app.tk.Tk()
+    except app.tk.TclError:
+        return False
+
+    window = app.GoogleStyleFileCopyApp(root)
+    root.update()
+    window.index = make_index(paths)
+    start = time.perf_counter()
+    window.populate_file_tree()
+    root.update()
+    print(
+        f"tree {len(window.index):,} items  {(time.perf_counter() - start) * 1000:7.1f} ms"
+    )
+
+    for query in QUERIES + [""]:
+        window.search_var.set(query)
+        start = time.perf_counter()
+        window.apply_search()
+        root.update()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{query!r:24} {window.search_status_var.get():>32}  {elapsed:7.1f} ms")
+    root.destroy()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paths", type=int, default=100000)
+    args = parser.parse_args()
+
+    paths = make_paths(args.paths)
+    start = time.perf_counter()
+    matcher = app.PathMatcher(paths)
+    print(f"build {len(paths):,} paths  {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+    for query in QUERIES:
+        start = time.perf_counter()
+        matches = matcher.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{query!r:24} {len(matches):7,} matches  {elapsed:7.1f} ms")
+
+    print("filter and redraw:")
+    if not time_redraw(paths):
+        print("skipped (no display)")
+
+
+if __name__ == "__main__":
+    main()
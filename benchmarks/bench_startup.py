@@ -0,0 +1,104 @@
+"""Measure startup time against a budget.
+
+Each run starts a fresh interpreter and times three points: importing
+app, constructing the window (the sections shown on first paint), and
+finishing the first idle pass, which builds the deferred file list and
+preview sections. The window stages need a display and are reported as
+skipped without one. The median over all runs is checked against the
+budget, and the exit status is 1 when it is exceeded.
+
+    python benchmarks/bench_startup.py [--runs 7] [--budget-ms 150]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = [
+    "asyncio",
+    "concurrent.futures",
+    "subprocess",
+    "zipfile",
+    "tarfile",
+    "xml.sax.saxutils",
+    "pyperclip",
+]
+
+
+def measure():
+    """Time startup in this (fresh) interpreter and print it as JSON."""
+    start = time.perf_counter()
+    sys.path.insert(0, REPO)
+    import app
+
+    timings = {"import": time.perf_counter() - start}
+    # Slow modules should stay unimported until a feature needs them
+    timings["eager"] = [name for name in LAZY_MODULES if name in sys.modules]
+    try:
+        root = app.tk.Tk()
+    except app.tk.TclError:
+        print(json.dumps(timings))
+        return
+
+    root.geometry("1000x800")
+    app.GoogleStyleFileCopyApp(root)
+    timings["window"] = time.perf_counter() - start
+    root.update()
+    timings["complete"] = time.perf_counter() - start
+    root.destroy()
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=150.0,
+        help="budget for the window stage, or for the import without a display",
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure()
+        return
+
+    # Imported here so the child interpreter does not load it itself
+    import subprocess
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+
+    print(f"median of {args.runs} runs")
+    for stage in ("import", "window", "complete"):
+        values = [run[stage] for run in runs if stage in run]
+        if values:
+            print(f"{stage:<10} {statistics.median(values) * 1000:8.1f} ms")
+        else:
+            print(f"{stage:<10}  skipped (no display)")
+    if runs[-1].get("eager"):
+        print("imported at startup:", ", ".join(runs[-1]["eager"]))
+
+    stage = "window" if "window" in runs[0] else "import"
+    elapsed = statistics.median(run[stage] for run in runs) * 1000
+    verdict = "within" if elapsed <= args.budget_ms else "over"
+    print(f"{stage} {elapsed:.1f} ms is {verdict} the {args.budget_ms:g} ms budget")
+    sys.exit(0 if elapsed <= args.budget_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
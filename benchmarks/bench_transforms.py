@@ -0,0 +1,78 @@
+"""Benchmark the post-read transform stage across process-pool sizes.
+
+Generates a synthetic source tree, reads it once, then times run_transforms
+in-process and with 1, 2, 4 ... N worker processes.
+
+    python benchmarks/bench_transforms.py [--files 4000] [--size 16384]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def heavy_transform(file_path, content):
+    """Stand-in for CPU-bound work such as token counting or hashing."""
+    data = content.encode("utf-8")
+    for level in range(1, 10):
+        zlib.compress(data, level)
+    return app.collapse_blank_lines(file_path, content)
+
+
+def make_tree(root, files, size):
+    line = "    value = compute(value, 42)  # trailing   \n\n\n"
+    body = line * (size // len(line))
+    for i in range(files):
+        directory = os.path.join(root, f"pkg{i % 50}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"module{i}.py"), "w") as file:
+            file.write(f"# module {i}\n{body}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=4000)
+    parser.add_argument("--size", type=int, default=16384)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, args.files, args.size)
+        index = app.scan_roots([root], True, frozenset())
+        items = []
+        for record in index.files():
+            with open(record.path, encoding="utf-8") as file:
+                items.append((record.path, file.read()))
+
+        transforms = (heavy_transform,)
+        print(f"{len(items)} files, {sum(len(c) for _, c in items) / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        app.run_transforms(items, transforms)
+        baseline = time.perf_counter() - start
+        print(f"in-process   {baseline:7.2f} s")
+
+        cpus = os.cpu_count() or 1
+        workers = 1
+        while True:
+            start = time.perf_counter()
+            app.run_transforms(
+                items, transforms, use_processes=True, max_workers=workers
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{workers:2d} processes {elapsed:7.2f} s  ({baseline / elapsed:.1f}x)"
+            )
+            if workers >= cpus:
+                break
+            workers = min(workers * 2, cpus)
+
+
+if __name__ == "__main__":
+    main()